@@ -0,0 +1,135 @@
+import copy
+import json
+from time import perf_counter_ns, sleep
+import numpy as np
+from monitor import CallbackStats
+from engine import FXEngine, STAGE_NAMES
+from nodes import NODES
+
+# --- Live audio I/O: a sounddevice duplex stream feeding an FXEngine ---
+
+RATES = (44100, 48000, 96000) # what the DSP is voiced for: every time constant is in ms / s and converted with fs
+PROBE_SIZES = (256, 128, 64) # tried in this order by probe_block_size; 512 next if 256 isn't stable
+FALLBACK_BLOCK = 1024 # when nothing smaller is stable (or there is no device to probe)
+PROBE_MAX_LOAD = 0.5 # mean callback load a probe may reach: a crossfade runs two chains for a moment
+
+def list_devices():
+    import sounddevice as sd
+    return [f"{i}: {d['name']} ({d['max_input_channels']} in / {d['max_output_channels']} out)" for i, d in enumerate(sd.query_devices())]
+
+def find_device(spec=None):
+    # spec: device index, part of its name (case-insensitive, e.g. "USB Audio"), or None for the
+    # system default; returns what sd.Stream takes as device=
+    if spec is None or isinstance(spec, int): return spec
+    if spec.isdigit(): return int(spec)
+    import sounddevice as sd
+    for i, d in enumerate(sd.query_devices()):
+        if spec.lower() in d["name"].lower() and d["max_input_channels"] >= 1 and d["max_output_channels"] >= 2: return i
+    raise ValueError(f"no audio device with input and output matching {spec!r}")
+
+
+class AudioStream:
+    """Mono guitar in, dual-mono out; everything in between is the engine's job."""
+
+    def __init__(self, engine, device=None):
+        self.engine = engine
+        self.device = device # see find_device
+        self.stream = None
+        self.mute = False # output silence (tuner mode)
+        self.input_tap = None # optional callable given every raw input block
+        self.meter = None # optional meters.MeterTap, given every input / output block
+        self.stats = CallbackStats(engine.fs, engine.block_size, STAGE_NAMES)
+        engine.stats = self.stats
+
+    def audio_callback(self, indata, outdata, frames, time, status):
+        t0 = perf_counter_ns()
+        if status: self.stats.record_status(status)
+        self.stats.record_latency(time.inputBufferAdcTime, time.outputBufferDacTime)
+        try:
+            if self.input_tap is not None: self.input_tap(indata[:, 0])
+            if self.mute:
+                outdata.fill(0)
+                return
+            self.engine.process_into(indata, outdata)
+            if self.meter is not None: self.meter.write(indata[:, 0], outdata[:, 0], self.engine.gate_gain())
+        except Exception as e:
+            outdata.fill(0) # still fail silent on stage, but keep count of it
+            self.stats.record_exception(e)
+        finally:
+            self.stats.end_block(t0)
+
+    def start(self):
+        # True once the stream runs; errors are printed with the devices there are to choose from
+        try:
+            import sounddevice as sd # only needed once a device is actually opened
+            self.stream = sd.Stream(device=find_device(self.device), channels=(1, 2), callback=self.audio_callback, samplerate=self.engine.fs,
+                                    blocksize=self.engine.block_size, dtype=self.engine.dtype.name, latency="low")
+            self.stream.start()
+            self.stats.nominal_ms = sum(self.stream.latency) * 1000
+            return True
+        except Exception as e:
+            print(f"Audio Error: {e}")
+            try: print("Audio devices:\n  " + "\n  ".join(list_devices()))
+            except Exception: pass
+            self.stream = None
+            return False
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop(); self.stream.close(); self.stream = None
+
+
+def probe_block_size(fs, state, device=None, dtype="float32", sizes=PROBE_SIZES, seconds=2.0, max_load=PROBE_MAX_LOAD, cache=None):
+    # plays `state` live with every effect in its chain switched on (the most it will be asked to
+    # do) and finds the smallest size that holds up: no xrun, no missed deadline and mean load
+    # under max_load over `seconds`. Goes down through `sizes` while they pass; when the first
+    # fails, doubles from it up to FALLBACK_BLOCK instead. Needs the device to itself for a few
+    # seconds, so with `cache` (a JSON file) the answer is kept per device, rate and dtype and
+    # the probe only runs the first time; delete the file to probe again.
+    key = f"{device}|{fs}|{np.dtype(dtype).name}"
+    if cache is not None:
+        try:
+            with open(cache) as f: return int(json.load(f)[key])
+        except (OSError, ValueError, KeyError, TypeError): pass
+    state = copy.deepcopy(state)
+    for name in NODES: state[name] = True
+    first = _probe(fs, state, device, dtype, sizes[0], seconds, max_load)
+    if first is None: return FALLBACK_BLOCK # no device to play on: nothing to remember either
+    best = None
+    if first:
+        best = sizes[0]
+        for size in sizes[1:]:
+            if not _probe(fs, state, device, dtype, size, seconds, max_load): break
+            best = size
+    else:
+        size = sizes[0] * 2
+        while best is None and size < FALLBACK_BLOCK:
+            if _probe(fs, state, device, dtype, size, seconds, max_load): best = size
+            size *= 2
+    best = best or FALLBACK_BLOCK
+    if cache is not None:
+        try:
+            with open(cache) as f: known = json.load(f)
+        except (OSError, ValueError): known = {}
+        known[key] = best
+        try:
+            with open(cache, "w") as f: json.dump(known, f, indent=1)
+        except OSError: pass
+    return best
+
+def _probe(fs, state, device, dtype, size, seconds, max_load):
+    # True / False: whether `size` held up; None when the stream wouldn't open
+    engine = FXEngine(fs, size, dtype=dtype)
+    engine.set_preset(state)
+    audio = AudioStream(engine, device)
+    if not audio.start(): return None
+    sleep(0.5); audio.stop() # first blocks pay for page faults and lazy setup
+    audio.stats.reset() # the callback is done with it once the stream is stopped
+    if not audio.start(): return None
+    sleep(seconds)
+    audio.stop()
+    st = audio.stats
+    ok = st.blocks > 0 and not st.xruns and not st.deadline_misses and st.load < max_load
+    print(f"Block {size}: load {st.load:.0%} (peak {st.peak_load:.0%}), {st.xruns} xruns, {st.deadline_misses} missed deadlines, "
+          f"latency {st.latency_ms:.1f} ms -> {'stable' if ok else 'unstable'}")
+    return ok
@@ -0,0 +1,182 @@
+import argparse
+import copy
+import fnmatch
+import json
+import os
+import platform
+import tempfile
+import time
+import numpy as np
+from scipy.io import wavfile
+import convolver
+import kernels
+from engine import FXEngine
+from presets import load_bank, default_preset, SLOTS
+
+# DSP benchmark: every stage and every stored preset over synthetic guitar input.
+#
+#   python bench.py                              # full matrix, table on stdout
+#   python bench.py --json results.json          # also save machine-readable results
+#   python bench.py --cases "preset/*" --blocks 256 1024 --dtypes float32
+#   python bench.py --compare baseline.json      # exit 1 if any case got slower than --tolerance
+#   python bench.py --kernels compare --cases "mod/Flanger" dly gate   # NumPy vs numba kernels (kernels.py)
+#
+# Per case it reports microseconds per block (mean / p50 / p99 / max), the real-time factor
+# (processing time / block duration, lower is better) and the headroom left against the
+# callback deadline at 44.1 and 48 kHz, computed from the p99 time.
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets.db")
+BLOCKS = [64, 128, 256, 512, 1024, 2048, 4096]
+DTYPES = ["float32", "float64"]
+RATES = [44100, 48000, 96000]
+DRIVE_MODES = ["Clean", "Overdrive 1", "Overdrive 2", "Distortion", "Fuzz"]
+MOD_TYPES = ["Chorus", "Flanger", "Tremolo"]
+
+def guitar_signal(fs, seconds, seed=0):
+    # plucked notes on the open strings: decaying harmonics plus a little pick noise, new note every 0.4 s
+    rng = np.random.default_rng(seed)
+    n = int(fs * seconds); t = np.arange(n) / fs
+    out = np.zeros(n)
+    note_len = int(0.4 * fs); tn = t[:note_len]
+    for start in range(0, n, note_len):
+        f0 = rng.choice([82.4, 110.0, 146.8, 196.0, 246.9, 329.6]) * rng.uniform(0.99, 1.01)
+        note = sum(np.sin(2 * np.pi * f0 * h * tn + rng.uniform(0, 2 * np.pi)) * np.exp(-tn * (2 + h)) / h for h in range(1, 9))
+        note[:200] += rng.standard_normal(200) * np.linspace(0.3, 0, 200)
+        seg = out[start:start + note_len]; seg += note[:len(seg)]
+    return 0.3 * out / np.abs(out).max()
+
+def bench_irs(fs, ir_dir):
+    # a 0.2 s cabinet and a 3 s room (decaying noise) in ir_dir, for main() to point IR_DIR at
+    # while the convolution cases run, so they don't depend on what is installed in irs/
+    rng = np.random.default_rng(1)
+    for kind, seconds in (("cab", 0.2), ("room", 3.0)):
+        n = int(seconds * fs); h = rng.standard_normal(n) * np.exp(-np.arange(n) / (0.15 * n))
+        os.makedirs(os.path.join(ir_dir, kind))
+        wavfile.write(os.path.join(ir_dir, kind, "bench.wav"), fs, h.astype(np.float32))
+
+def stage_cases(bank):
+    # (name, preset, what to time): "process_block" for the whole chain, otherwise "Node" or
+    # "Node.method" to call that node directly, e.g. "Amp.drive"
+    base = default_preset()
+    base.update({"Amp": True, "Gate": True, "Mod": True, "Dly": True, "Rev": True})
+    cases = []
+    for mode in DRIVE_MODES:
+        p = copy.deepcopy(base); p["Amp_Params"].update(Drive_Mode=mode, Gain=70, Warmth=40 if mode == "Clean" else 0)
+        cases.append((f"drive/{mode}", p, "Amp.drive"))
+    for os_factor in (2, 4):
+        p = copy.deepcopy(base); p["Amp_Params"].update(Drive_Mode="Distortion", Gain=70, Oversample=os_factor)
+        cases.append((f"drive/Distortion@{os_factor}x", p, "Amp.drive"))
+    p = copy.deepcopy(base); p["Amp_Params"].update(Bas=70, Mid=35, Tre=60)
+    cases.append(("eq", p, "Amp.tone"))
+    p = copy.deepcopy(base); p["Amp_Params"]["Cab"] = "bench"
+    cases.append(("cab", p, "Amp.cabinet"))
+    cases.append(("gate", copy.deepcopy(base), "Gate"))
+    for mt in MOD_TYPES:
+        p = copy.deepcopy(base); p["Mod_Params"]["Type"] = mt
+        cases.append((f"mod/{mt}", p, "Mod"))
+    cases.append(("dly", copy.deepcopy(base), "Dly"))
+    cases.append(("rev", copy.deepcopy(base), "Rev"))
+    p = copy.deepcopy(base); p["Rev_Params"]["IR"] = "bench"
+    cases.append(("rev/room", p, "Rev"))
+    for b in bank:
+        for s in SLOTS:
+            cases.append((f"preset/{b}{s}", bank[b][s], "process_block"))
+    return cases
+
+def run_case(preset, stage, block, dtype, signal, fs, min_blocks, min_time):
+    engine = FXEngine(fs, block, dtype=dtype)
+    engine.set_preset(preset)
+    if stage == "process_block":
+        fn = engine.process_block
+    else:
+        name, _, method = stage.partition(".")
+        node = engine.voices[0].nodes[name]; params = node.compile(preset); node.prepare(params); call = getattr(node, method or "process")
+        fn = lambda blk: call(blk, params)
+    x = signal.astype(dtype)
+    nblk = len(x) // block
+    for i in range(min(nblk, 8)): fn(x[i * block:(i + 1) * block].copy()) # warm up caches and lazy state
+    times = []; i = 0; t_end = time.perf_counter() + min_time
+    while len(times) < min_blocks or time.perf_counter() < t_end:
+        blk = x[(i % nblk) * block:(i % nblk + 1) * block].copy()
+        t0 = time.perf_counter_ns(); fn(blk); times.append(time.perf_counter_ns() - t0)
+        i += 1
+    us = np.array(times) / 1000.0
+    res = {"block": block, "dtype": dtype, "blocks_timed": len(us),
+           "mean_us": float(us.mean()), "p50_us": float(np.median(us)), "p99_us": float(np.percentile(us, 99)), "max_us": float(us.max())}
+    for r in RATES:
+        deadline = block / r * 1e6
+        res[f"rtf_{r}"] = res["mean_us"] / deadline
+        res[f"headroom_{r}"] = 1.0 - res["p99_us"] / deadline
+    return res
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f: base = {(r["case"], r["block"], r["dtype"]): r for r in json.load(f)["results"]}
+    worse = []
+    for r in results:
+        b = base.get((r["case"], r["block"], r["dtype"]))
+        if b is None: continue
+        ratio = r["p50_us"] / b["p50_us"]
+        if ratio > 1 + tolerance: worse.append((r["case"], r["block"], r["dtype"], ratio))
+    for case, block, dtype, ratio in worse:
+        print(f"REGRESSION {case} block={block} {dtype}: {ratio:.2f}x slower than baseline")
+    print(f"{len(worse)} regression(s) over {tolerance:.0%} against {baseline_path}")
+    return not worse
+
+def run_cases(cases, args, signal):
+    results = []
+    gain_col = f"{'numpy us':>10}{'gain':>7}" if args.kernels == "compare" else ""
+    print(f"{'case':<22}{'block':>6}{'dtype':>9}{'mean us':>10}{'p99 us':>10}{'RTF@44.1k':>11}{'headroom@44.1k':>16}{'headroom@48k':>14}{gain_col}")
+    for name, preset, stage in cases:
+        for block in args.blocks:
+            for dtype in args.dtypes:
+                extra = ""
+                if args.kernels == "compare":
+                    kernels.ENABLED = False
+                    base = run_case(preset, stage, block, dtype, signal, args.fs, args.min_blocks, args.min_time)
+                    kernels.ENABLED = True
+                r = {"case": name, **run_case(preset, stage, block, dtype, signal, args.fs, args.min_blocks, args.min_time)}
+                if args.kernels == "compare":
+                    r["numpy_mean_us"] = base["mean_us"]; r["kernel_gain"] = base["mean_us"] / r["mean_us"]
+                    extra = f"{base['mean_us']:>10.1f}{r['kernel_gain']:>6.2f}x"
+                results.append(r)
+                print(f"{name:<22}{block:>6}{dtype:>9}{r['mean_us']:>10.1f}{r['p99_us']:>10.1f}{r['rtf_44100']:>11.3f}{r['headroom_44100']:>16.1%}{r['headroom_48000']:>14.1%}{extra}")
+    return results
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-stage DSP benchmark with real-time-factor report.")
+    ap.add_argument("--db", default=DB_FILE)
+    ap.add_argument("--cases", nargs="+", default=["*"], help="glob patterns, e.g. 'drive/*' 'preset/1*'")
+    ap.add_argument("--blocks", type=int, nargs="+", default=BLOCKS)
+    ap.add_argument("--dtypes", nargs="+", default=DTYPES, choices=DTYPES)
+    ap.add_argument("--fs", type=int, default=44100, choices=RATES, help="rate the engine runs at (delay lengths etc.)")
+    ap.add_argument("--min-blocks", type=int, default=200)
+    ap.add_argument("--min-time", type=float, default=0.2, help="seconds of timing per case at least")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="baseline JSON from an earlier run")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed p50 slowdown for --compare")
+    ap.add_argument("--kernels", choices=["auto", "numpy", "compare"], default="auto",
+                    help="numba kernels: when installed, never, or time both ways and report the gain")
+    args = ap.parse_args()
+    if args.kernels == "compare" and not kernels.AVAILABLE: raise SystemExit("--kernels compare needs numba")
+    kernels.ENABLED = kernels.AVAILABLE and args.kernels != "numpy"
+    kernels.warm_up()
+
+    signal = guitar_signal(args.fs, 3.0)
+    cases = [c for c in stage_cases(load_bank(args.db)) if any(fnmatch.fnmatch(c[0], pat) for pat in args.cases)]
+    with tempfile.TemporaryDirectory(prefix="bench-irs-") as ir_dir:
+        saved = convolver.IR_DIR
+        convolver.IR_DIR = ir_dir; bench_irs(args.fs, ir_dir)
+        try:
+            results = run_cases(cases, args, signal)
+        finally:
+            convolver.IR_DIR = saved; convolver.ir_partitions.cache_clear() # nothing cached from the scratch IRs outlives them
+
+    if args.json:
+        meta = {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                "processor": platform.processor(), "fs": args.fs, "kernels": "numba" if kernels.ENABLED else "numpy", "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(args.json, "w") as f: json.dump({"meta": meta, "results": results}, f, indent=1)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,451 @@
+from functools import lru_cache
+import numpy as np
+from scipy.linalg import hadamard
+from scipy.signal import sosfilt
+import kernels
+
+# --- Block-based DSP building blocks used by the audio callback ---
+
+class DelayLine:
+    """Ring buffer with a moving write pointer and fractional (linearly interpolated) read taps.
+
+    All scratch space is sized from block_size up front, so reading and writing a block
+    never allocates and costs the same however long the line is. Samples are stored as
+    `dtype`; read positions are always worked out in float64.
+    """
+
+    def __init__(self, max_delay, block_size=1024, dtype=np.float64):
+        self.size = int(max_delay) + block_size + 2
+        self.block_size = block_size
+        self.buffer = np.zeros(self.size, dtype)
+        self.ptr = 0 # next slot to be written
+        self._ramp = np.arange(block_size, dtype=float)
+        self._pos = np.empty(block_size)
+        self._frac = np.empty(block_size)
+        self._i0 = np.empty(block_size, dtype=np.int64)
+        self._i1 = np.empty(block_size, dtype=np.int64)
+        self._b = np.empty(block_size, dtype)
+        self._fb = np.empty(block_size, dtype)
+        self._d = np.empty(block_size) # a scalar delay spread over the block, for the compiled kernel
+        # the fractions again in the sample dtype: mixed-dtype ufuncs allocate casting buffers
+        self._fracd = self._frac if self.buffer.dtype == self._frac.dtype else np.empty(block_size, dtype)
+
+    def reset(self):
+        self.buffer.fill(0)
+        self.ptr = 0
+
+    def write(self, data):
+        n = len(data); e = self.ptr + n
+        if e <= self.size:
+            self.buffer[self.ptr:e] = data
+        else:
+            k = self.size - self.ptr
+            self.buffer[self.ptr:] = data[:k]
+            self.buffer[:n - k] = data[k:]
+        self.ptr = e % self.size
+
+    def _taps(self, delay, n, offset):
+        # interpolation taps for `delay` (scalar or per-sample array) samples behind slots ptr + offset + i
+        pos, frac, i0, i1 = self._pos[:n], self._frac[:n], self._i0[:n], self._i1[:n]
+        np.add(self._ramp[:n], self.ptr + offset, out=pos)
+        np.subtract(pos, delay, out=pos)
+        np.floor(pos, out=frac)
+        i0[:] = frac
+        np.subtract(pos, frac, out=frac)
+        np.mod(i0, self.size, out=i0)
+        np.add(i0, 1, out=i1)
+        np.mod(i1, self.size, out=i1)
+        if self._fracd is not self._frac: self._fracd[:n] = frac
+
+    def _gather(self, s, e, out):
+        b = self._b[s:e]
+        np.take(self.buffer, self._i0[s:e], out=out, mode="clip") # indices are already wrapped; "clip" skips the bounds-check copy
+        np.take(self.buffer, self._i1[s:e], out=b, mode="clip")
+        b -= out; b *= self._fracd[s:e]; out += b
+
+    def read(self, delay, out, offset=0):
+        n = len(out)
+        self._taps(delay, n, offset)
+        self._gather(0, n, out)
+        return out
+
+    def process(self, x, delay, fb, out):
+        # read the delayed signal into out and write x + out * fb back into the line.
+        # Delays shorter than the block are split into sub-blocks no longer than the shortest
+        # delay inside them, so a tap never reads a slot that hasn't been written yet.
+        frames, s = len(x), 0
+        if kernels.ENABLED:
+            if np.ndim(delay) == 0: d = self._d[:frames]; d.fill(delay)
+            else: d = delay
+            self.ptr = kernels.delay_feedback(self.buffer, self.ptr, x, d, fb, out)
+            return out
+        self._taps(delay, frames, 0) # write slots advance one per sample, so the taps are known up front
+        scalar = np.ndim(delay) == 0
+        while s < frames:
+            if scalar:
+                L = int(delay)
+            else:
+                L = int(delay[s:s + max(1, int(delay[s]))].min())
+            e = min(s + max(1, L), frames)
+            o = out[s:e]
+            self._gather(s, e, o)
+            t = self._fb[s:e]
+            np.multiply(o, fb, out=t); t += x[s:e]
+            self.write(t)
+            s = e
+        return out
+
+
+class Modulator:
+    """Chorus / Flanger / Tremolo computed a whole block at a time."""
+
+    # mod_type is an index into MOD_TYPES; (base delay ms, LFO range ms, feedback) for the
+    # delay-based ones, same voicing as the original per-sample loop (200 / 100 and 50 / 40 samples at 44.1 kHz)
+    CHORUS, FLANGER, TREMOLO = range(3)
+    MOD_TYPES = ("Chorus", "Flanger", "Tremolo")
+    VOICING_MS = ((4.535, 2.268, 0.0), (1.134, 0.907, 0.5))
+
+    def __init__(self, fs, block_size=1024, dtype=np.float64):
+        self.fs = fs
+        self.voicing = tuple((base * fs / 1000, rng * fs / 1000, fb) for base, rng, fb in self.VOICING_MS) # in samples
+        self.line = DelayLine(int(max(b + r for b, r, _ in self.voicing)) + 2, block_size, dtype)
+        self._wet = np.empty(block_size, dtype)
+        self._ramp = np.arange(block_size, dtype=float)
+        self._lfo = np.empty(block_size) # float64: it becomes delay positions
+        self._gain = np.empty(block_size, dtype)
+        self.phase = 0.0 # LFO phase in cycles, kept in [0, 1) so any Rate wraps without a jump
+
+    def reset(self):
+        self.line.reset()
+        self.phase = 0.0
+
+    def lfo(self, rate, frames):
+        inc = rate / self.fs
+        lfo = self._lfo[:frames]
+        np.multiply(self._ramp[:frames], 2 * np.pi * inc, out=lfo)
+        lfo += 2 * np.pi * self.phase
+        np.sin(lfo, out=lfo)
+        self.phase = (self.phase + frames * inc) % 1.0
+        return lfo
+
+    def process(self, sig, mod_type, rate, depth):
+        n = len(sig)
+        lfo = self.lfo(rate, n)
+        if mod_type == self.TREMOLO:
+            # gain swings between 1 and (1 - depth): 1 - depth/2 * (1 - lfo)
+            g = self._gain[:n]; g[:] = lfo
+            g *= depth * 0.5; g += 1.0 - depth * 0.5
+            sig *= g
+            return sig
+
+        base, m_rng, fb = self.voicing[mod_type]
+        lfo *= m_rng; lfo += base # now the delay in samples
+        wet = self._wet[:n]
+        if fb == 0:
+            # no feedback: the whole block can go in before reading it back
+            self.line.write(sig)
+            self.line.read(lfo, wet, offset=-n)
+        else:
+            self.line.process(sig, lfo, fb, wet)
+        sig *= (1 - depth); wet *= depth; sig += wet
+        return sig
+
+
+class Delay:
+    """Feedback delay on a DelayLine; the read position glides towards a new Time instead of jumping."""
+
+    def __init__(self, fs, block_size=1024, max_time=2.0, glide_time=0.08, dtype=np.float64):
+        self.fs = fs
+        self.max_delay = int(fs * max_time)
+        self.line = DelayLine(self.max_delay, block_size, dtype)
+        self.glide_time = glide_time
+        self.current = None # delay in samples currently being read
+        self._delay = np.empty(block_size)
+        self._wet = np.empty(block_size, dtype)
+        self._ramp = np.arange(1, block_size + 1, dtype=float)
+
+    def reset(self):
+        self.line.reset()
+        self.current = None
+
+    def samples(self, time_ms):
+        return min(max(time_ms / 1000.0 * self.fs, 1.0), self.max_delay)
+
+    def process(self, sig, target, feedback, mix):
+        # target: delay in samples, as returned by samples()
+        frames = len(sig)
+        if self.current is None or abs(target - self.current) < 0.01:
+            self.current = delay = target
+        else:
+            # one-pole glide per block, ramped linearly across the block
+            nxt = self.current + (target - self.current) * (1 - np.exp(-frames / (self.glide_time * self.fs)))
+            delay = self._delay[:frames]
+            np.multiply(self._ramp[:frames], (nxt - self.current) / frames, out=delay)
+            delay += self.current
+            self.current = nxt
+        wet = self.line.process(sig, delay, feedback, self._wet[:frames])
+        sig *= (1 - mix); wet *= mix; sig += wet
+        return sig
+
+
+class Reverb:
+    """Feedback delay network: `lines` delay lines (8 or 16), each through its own one-pole
+    lowpass and decay gain, fed back through a normalised Hadamard matrix.
+
+    Every line is at least one sub-block long, so a sub-block of line outputs can all be read
+    before any of it is written back: read, damp, mix and write are a few (n, lines) array
+    operations per sub-block. Cost goes with the number of lines and the block size; the
+    decay time only changes the gains.
+
+    Everything is stored time-major, a row of `lines` samples per instant, so a sub-block is
+    always one contiguous run and NumPy never needs scratch space of its own for it.
+    """
+
+    DELAYS_MS = (29.7, 31.9, 34.3, 37.1, 39.7, 42.9, 45.3, 48.7, 52.1, 55.9, 59.3, 63.7, 67.1, 71.9, 76.3, 81.1)
+
+    def __init__(self, fs, block_size=1024, dtype=np.float64, lines=8):
+        self.fs = fs
+        self.dtype = np.dtype(dtype)
+        # prime lengths: no two lines share a period, so their echoes don't pile up on the same samples
+        self.delays = np.array([_prime_from(int(ms * fs / 1000)) for ms in self.DELAYS_MS[::len(self.DELAYS_MS) // lines]])
+        self.sub = min(block_size, int(self.delays.min()))
+        self.size = L = int(self.delays.max()) + self.sub
+        self.lines = np.zeros((2 * L, lines), dtype) # slot i stored at i and i + L, so every read is in one piece
+        self.ptr = 0 # next slot to be written, same for all lines
+        self.matrix = (hadamard(lines) / np.sqrt(lines)).astype(dtype) # orthogonal and symmetric: the loop loses energy only in the gains
+        self.taps = (np.resize([1.0, -1.0], lines) / np.sqrt(lines)).astype(dtype) # output: alternating signs decorrelate it from the input
+        self._ones = np.ones((1, lines), dtype)
+        self._base = (((L - self.delays)[None, :] + np.arange(self.sub)[:, None]) * lines + np.arange(lines)).astype(np.int64) # read positions at ptr = 0
+        self._idx = np.empty_like(self._base)
+        self._flat = self.lines.reshape(-1)
+        self._zi = np.zeros(lines, dtype) # lowpass state per line
+        self._z = np.empty(lines, dtype)
+        self._rd = np.empty((self.sub, lines), dtype)
+        self._d = np.empty((self.sub, lines), dtype) # damped line outputs
+        self._t = np.empty(self.sub * lines, dtype) # scan scratch
+        self._fb = np.empty((self.sub, lines), dtype)
+        self._wet = np.empty(block_size, dtype)
+
+    def reset(self):
+        self.lines.fill(0); self._zi.fill(0)
+        self.ptr = 0
+
+    def tail(self):
+        # a quiet output can still have something on its way round the longest line
+        return int(self.delays.max())
+
+    def coefficients(self, t60, damp):
+        # t60: seconds to -60 dB at low frequencies; damp 0..1 shortens it at Nyquist down to a tenth,
+        # so the highs die away first. Each line's one-pole y = b x + p y[-1] takes off that line's
+        # share of 60 dB per pass, at DC and at Nyquist alike, so long and short lines decay together.
+        # Worked out on the control thread, with b and the powers of p the scan in _damp() multiplies
+        # by laid out like a sub-block (one per line, repeated for every instant).
+        t60n = t60 * (1 - 0.9 * damp)
+        g0 = 10 ** (-3 * self.delays / (t60 * self.fs))
+        gn = 10 ** (-3 * self.delays / (t60n * self.fs))
+        p = (g0 - gn) / (g0 + gn) # b / (1 - p) = g0, b / (1 + p) = gn
+        b = g0 * (1 - p)
+        dt = self.dtype
+        steps = tuple(np.tile(p ** (1 << j), self.sub).astype(dt) for j in range(max(1, (self.sub - 1).bit_length())))
+        return b.astype(dt), p.astype(dt), np.tile(b, self.sub).astype(dt), steps
+
+    def _write(self, y):
+        n = len(y); L = self.size; w = self.ptr; e = w + n
+        if e <= L:
+            self.lines[w:e] = y; self.lines[w + L:e + L] = y
+        else:
+            k = L - w
+            self.lines[w:L] = y[:k]; self.lines[w + L:] = y[:k]
+            self.lines[:n - k] = y[k:]; self.lines[L:L + n - k] = y[k:]
+        self.ptr = e % L
+
+    def _damp(self, x, out, coeffs):
+        # out[:, i] = line i's one-pole over x[:, i], from and updating the state in _zi
+        b, p, bs, steps = coeffs
+        if kernels.ENABLED: kernels.one_pole_cols(x, out, b, p, self._zi); return out
+        n, N = x.shape
+        o = out.reshape(-1); t = self._t
+        np.multiply(x.reshape(-1), bs[:n * N], out=o)
+        np.multiply(p, self._zi, out=self._z); out[0] += self._z
+        k = 1
+        for pk in steps: # prefix scan: row r gathers the rows r - j, times p^j, for j < 2k
+            if k >= n: break
+            m = (n - k) * N
+            np.multiply(o[:m], pk[:m], out=t[:m]); o[k * N:] += t[:m]
+            k *= 2
+        self._zi[:] = out[n - 1]
+        return out
+
+    def process(self, sig, coeffs, mix):
+        frames = len(sig)
+        wet = self._wet[:frames]
+        N = len(self.taps)
+        for s in range(0, frames, self.sub):
+            e = min(s + self.sub, frames); n = e - s
+            rd, d, fb, idx = self._rd[:n], self._d[:n], self._fb[:n], self._idx[:n]
+            np.add(self._base[:n], self.ptr * N, out=idx)
+            np.take(self._flat, idx, out=rd, mode="clip") # every line's delayed sub-block in one gather
+            np.dot(rd, self.taps, out=wet[s:e])
+            self._damp(rd, d, coeffs)
+            np.matmul(d, self.matrix, out=fb)
+            np.matmul(sig[s:e, None], self._ones, out=rd); fb += rd # input onto every line (a broadcast add would make NumPy buffer it)
+            self._write(fb)
+        sig *= (1 - mix); wet *= mix; sig += wet
+        return sig
+
+def _prime_from(n):
+    while n < 2 or any(n % k == 0 for k in range(2, int(n ** 0.5) + 1)): n += 1
+    return n
+
+
+class OnePole:
+    """y[n] = c * y[n-1] + (1 - c) * x[n] over a whole block, with no Python loop and no temporaries.
+
+    Unrolled, y[n] = c^n * (c * y[-1] + (1 - c) * sum_{k<=n} c^-k x[k]): a cumulative sum between
+    two fixed weightings, in float64. Blocks go in chunks short enough for c^-k to stay in range.
+    """
+
+    def __init__(self, fs, ms, block_size=1024):
+        self.coef = c = np.exp(-1000.0 / (ms * fs)) # time constant in ms
+        self.chunk = max(1, min(block_size, int(300 / -np.log(c)))) # c^-chunk <= e^300
+        k = np.arange(self.chunk)
+        self._w_in = (1 - c) * c ** -k.astype(float)
+        self._w_out = c ** k.astype(float)
+        self.y = 0.0
+
+    def reset(self, y=0.0):
+        self.y = y
+
+    def process(self, x, out):
+        # x, out: float64, may be the same array
+        if kernels.ENABLED: self.y = kernels.one_pole(x, out, self.coef, self.y); return out
+        c = self.coef
+        for s in range(0, len(x), self.chunk):
+            e = min(s + self.chunk, len(x)); m = e - s; o = out[s:e]
+            np.multiply(x[s:e], self._w_in[:m], out=o)
+            o[0] += c * self.y
+            np.cumsum(o, out=o); o *= self._w_out[:m]
+            self.y = o[-1]
+        return out
+
+
+class Gate:
+    """Noise gate on a mean-square envelope: opens above the threshold, closes `hysteresis_db`
+    below it, stays open `hold_ms` after that, and fades in / out over attack / release.
+
+    Open/closed and hold come from running maxima of event positions (np.maximum.accumulate),
+    the fades from two one-pole smoothings of the open/closed target, fast and slow, taking
+    whichever is higher: rising follows the fast one, falling the slow one.
+    """
+
+    def __init__(self, fs, block_size=1024, dtype=np.float64, hysteresis_db=6.0, detect_ms=5.0, attack_ms=1.0, hold_ms=50.0, release_ms=80.0):
+        self.close_ratio = 10 ** (-hysteresis_db / 10) # of the opening threshold, in power
+        self.hold = int(hold_ms * fs / 1000)
+        self.detector = OnePole(fs, detect_ms, block_size)
+        self.attack = OnePole(fs, attack_ms, block_size)
+        self.release = OnePole(fs, release_ms, block_size)
+        self.is_open = False
+        self.last_open = -self.hold # position of the last open sample, relative to the next block
+        self.gain = 0.0 # at the end of the last block (meters)
+        self._pos = np.arange(block_size, dtype=np.int64)
+        self._pos1 = self._pos + 1 # 1-based, 0 = no event yet
+        self._sq = np.empty(block_size, dtype)
+        self._env = np.empty(block_size)
+        self._fast = np.empty(block_size)
+        self._slow = np.empty(block_size)
+        self._g = np.empty(block_size, dtype)
+        self._up = np.empty(block_size, dtype=bool)
+        self._down = np.empty(block_size, dtype=bool)
+        self._open = np.empty(block_size, dtype=bool)
+        self._lu = np.empty(block_size, dtype=np.int64)
+        self._ld = np.empty(block_size, dtype=np.int64)
+
+    def reset(self):
+        self.detector.reset(); self.attack.reset(); self.release.reset()
+        self.is_open = False
+        self.last_open = -self.hold
+        self.gain = 0.0
+
+    def process(self, sig, threshold):
+        # threshold: linear RMS level at which the gate opens
+        n = len(sig)
+        sq, env = self._sq[:n], self._env[:n]
+        np.multiply(sig, sig, out=sq); env[:] = sq # float64 from here on
+        self.detector.process(env, env)
+        on = threshold * threshold
+        up, down, is_open = self._up[:n], self._down[:n], self._open[:n]
+        np.greater(env, on, out=up); np.less(env, on * self.close_ratio, out=down)
+        # hysteresis: open wherever the latest crossing was upwards
+        lu, ld = self._lu[:n], self._ld[:n]
+        lu.fill(0); np.copyto(lu, self._pos1[:n], where=up); np.maximum.accumulate(lu, out=lu)
+        ld.fill(0); np.copyto(ld, self._pos1[:n], where=down); np.maximum.accumulate(ld, out=ld)
+        (np.greater_equal if self.is_open else np.greater)(lu, ld, out=is_open) # no crossing yet: stays as it was
+        self.is_open = bool(is_open[-1])
+        # hold: open until `hold` samples after the last open sample
+        lu.fill(self.last_open); np.copyto(lu, self._pos[:n], where=is_open); np.maximum.accumulate(lu, out=lu)
+        self.last_open = int(lu[-1]) - n
+        np.subtract(self._pos[:n], lu, out=lu)
+        np.less(lu, self.hold, out=is_open)
+        fast, slow = self._fast[:n], self._slow[:n]
+        fast[:] = is_open
+        self.release.process(fast, slow); self.attack.process(fast, fast)
+        np.maximum(fast, slow, out=fast)
+        self.gain = float(fast[-1])
+        g = self._g[:n]; g[:] = fast
+        sig *= g
+        return sig
+
+
+# --- Tone stack: biquads cascaded as second-order sections ---
+
+def shelf_biquad(fs, freq, gain_db, shelf_type):
+    A = 10**(gain_db / 40); omega = 2 * np.pi * freq / fs; sn = np.sin(omega); cs = np.cos(omega)
+    beta = np.sqrt((A**2 + 1) / 0.7 - (A - 1)**2) / 2
+    if beta < 0: beta = 0
+    if shelf_type == "low":
+        b = [A*((A+1)-(A-1)*cs+2*beta*sn), 2*A*((A-1)-(A+1)*cs), A*((A+1)-(A-1)*cs-2*beta*sn)]
+        a = [(A+1)+(A-1)*cs+2*beta*sn, -2*((A-1)+(A+1)*cs), (A+1)+(A-1)*cs-2*beta*sn]
+    else:
+        b = [A*((A+1)+(A-1)*cs+2*beta*sn), -2*A*((A-1)+(A+1)*cs), A*((A+1)+(A-1)*cs-2*beta*sn)]
+        a = [(A+1)-(A-1)*cs+2*beta*sn, 2*((A-1)-(A+1)*cs), (A+1)-(A-1)*cs-2*beta*sn]
+    return np.array(b + a) / a[0]
+
+def peaking_biquad(fs, freq, gain_db, Q):
+    A = 10**(gain_db / 40); omega = 2 * np.pi * freq / fs; alpha = np.sin(omega)/(2*Q); cs = np.cos(omega)
+    b = [1+alpha*A, -2*cs, 1-alpha*A]; a = [1+alpha/A, -2*cs, 1-alpha/A]
+    return np.array(b + a) / a[0]
+
+# (kind, frequency, dB at the ends of the 0..100 knob, Q) for Bas / Mid / Tre
+EQ_BANDS = (("low", 250, 20, None), ("peak", 1000, 18, 1.0), ("high", 5000, 20, None))
+
+@lru_cache(maxsize=128)
+def eq_sos(fs, positions, bands=EQ_BANDS, dtype=np.float64):
+    # one SOS row per band; cached so a preset's coefficients are only ever worked out once.
+    # The returned array is shared between callers, treat it as read-only.
+    rows = []
+    for (kind, freq, rng, Q), pos in zip(bands, positions):
+        gain_db = (pos - 50) / 50 * rng
+        rows.append(peaking_biquad(fs, freq, gain_db, Q) if kind == "peak" else shelf_biquad(fs, freq, gain_db, kind))
+    return np.array(rows, dtype) # designed in float64, stored in the engine's dtype so sosfilt doesn't promote
+
+
+class EQ:
+    """Any number of biquad bands run as one SOS cascade with a single combined state."""
+
+    def __init__(self, fs, bands=EQ_BANDS, dtype=np.float64):
+        self.fs = fs
+        self.bands = bands
+        self.dtype = dtype
+        self.zi = np.zeros((len(bands), 2), dtype)
+
+    def reset(self):
+        self.zi.fill(0)
+
+    def coefficients(self, *positions):
+        # UI thread, when a knob or preset changes; the result is handed back to process()
+        return eq_sos(self.fs, tuple(positions), self.bands, self.dtype)
+
+    def process(self, sig, sos):
+        # sosfilt has no out=: the one array per block it returns is the only allocation left in the Amp
+        sig, self.zi = sosfilt(sos, sig, zi=self.zi)
+        return sig
@@ -0,0 +1,241 @@
+import multiprocessing as mp
+import os
+import sys
+import threading
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from ringbuffer import SampleRing
+from meters import MeterTap
+from convolver import cache_ir
+from nodes import preset_irs
+
+# --- The DSP engine and the sound card stream in a process of their own ---
+#
+# RemoteEngine / RemoteAudio have the same surface the UI uses on FXEngine / AudioStream,
+# but everything audio runs in a child process with its own interpreter and GIL, pinned
+# to a core of its own where the OS allows it. A Tk redraw or a GC pass in the UI can no
+# longer hold up the callback.
+#
+#   UI -> DSP   preset dicts and small commands over a pipe; a control thread in the child
+#               compiles them (FXEngine.compile) and swaps the Snapshot in, as in-process.
+#               Impulse responses are resampled and transformed here first (cache_ir), so
+#               all the child's compile does for them is load the spectra from irs/.cache
+#   DSP -> UI   one SharedMemory block: the callback stats as float64 slots, refreshed by
+#               the control thread, a SampleRing of raw input for the tuner, then the
+#               MeterTap rings (levels per block, output samples for the spectrum)
+
+STATUS = ("alive", "blocks", "load", "peak_load", "deadline_misses", "xruns", "exceptions", "switch_last_ms", "switch_worst_ms", "switch_at_ns", "round_trip_ms", "nominal_ms")
+INPUT_RING = 1 << 16 # samples of raw input kept for the tuner (> 2x its window, 16384 at 96 kHz)
+PUBLISH_EVERY = 0.1 # seconds between status refreshes
+
+def _layout():
+    # (status bytes, ring bytes, meter bytes)
+    return 8 * len(STATUS), SampleRing.nbytes(INPUT_RING), MeterTap.nbytes()
+
+def pin_to_core(cpu=None):
+    # last core by default: on the Pi the UI and the OS tend to live on core 0
+    try:
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpu if cpu is not None else cores[-1]})
+    except (AttributeError, OSError): pass # not Linux, or not allowed
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(10)) # needs rtprio / CAP_SYS_NICE
+    except (AttributeError, OSError, PermissionError):
+        try: os.nice(-10)
+        except OSError: pass
+
+
+def _serve(conn, shm_name, fs, block_size, xfade_ms, dtype, cpu):
+    # child process entry point
+    import gc
+    from engine import FXEngine
+    from audio import AudioStream
+    pin_to_core(cpu)
+    shm = SharedMemory(name=shm_name)
+    n_status, n_ring, n_meter = _layout()
+    status = np.ndarray(len(STATUS), np.float64, shm.buf[:n_status])
+    ring = SampleRing(INPUT_RING, memory=shm.buf[n_status:n_status + n_ring])
+    meter = MeterTap(shm.buf[n_status + n_ring:n_status + n_ring + n_meter])
+    engine = FXEngine(fs, block_size, xfade_ms=xfade_ms, dtype=dtype)
+    audio = AudioStream(engine) # the device is only opened on "start"
+    gc.freeze() # everything built so far is long-lived: keep the collector from walking it
+
+    def publish():
+        st = audio.stats
+        status[:] = (1, st.blocks, st.load, st.peak_load, st.deadline_misses, st.xruns, st.exceptions,
+                     st.switch_last_ns / 1e6, st.switch_worst_ns / 1e6, st.switch_at_ns, st.round_trip_ms, st.nominal_ms)
+
+    try:
+        while True:
+            if not conn.poll(PUBLISH_EVERY):
+                publish(); continue
+            cmd, *args = conn.recv()
+            if cmd == "preset":
+                engine.set_preset(args[0])
+                if args[1]: audio.stats.set_preset(args[1])
+            elif cmd == "state": # knob edit: same preset, no crossfade
+                engine.state = args[0]; engine.refresh()
+            elif cmd == "bypass": engine.bypass = args[0]
+            elif cmd == "master_vol": engine.master_vol = args[0]
+            elif cmd == "reset": engine.reset()
+            elif cmd == "start": audio.device = args[0]; audio.start()
+            elif cmd == "mute": audio.mute = args[0]
+            elif cmd == "tap": audio.input_tap = ring.write if args[0] else None
+            elif cmd == "meter": audio.meter = meter if args[0] else None
+            elif cmd == "dump": audio.stats.dump(args[0])
+            elif cmd == "stop": break
+            publish()
+    except (EOFError, KeyboardInterrupt): pass # parent went away
+    finally:
+        audio.stop(); audio.input_tap = audio.meter = None
+        status[0] = 0
+        del status, ring, meter
+        try: shm.close()
+        except BufferError: pass # a view is still referenced; the mapping goes with the process
+
+
+def _start_without_main(proc):
+    # spawn runs the parent's __main__ again in the child (as __mp_main__) before the target:
+    # for main.py that is Tk, customtkinter and the GPIO driver in the DSP process. Without a
+    # path or module name to find it by, the child imports just this module and what it needs.
+    main = sys.modules["__main__"]
+    saved = {k: main.__dict__[k] for k in ("__file__", "__spec__") if k in main.__dict__}
+    main.__dict__.pop("__file__", None); main.__spec__ = None
+    try:
+        proc.start()
+    finally:
+        main.__dict__.update(saved)
+
+
+class RemoteEngine:
+    """FXEngine stand-in for the UI process; the real one runs in the DSP process."""
+
+    def __init__(self, fs=44100, block_size=1024, presets=None, xfade_ms=20.0, dtype=np.float32, cpu=None):
+        self.fs = fs
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+        self.presets = presets
+        self.state = None
+        self._bypass = False
+        self._master_vol = 0.8
+        n_status, n_ring, n_meter = _layout()
+        self.shm = SharedMemory(create=True, size=n_status + n_ring + n_meter)
+        self.status = np.ndarray(len(STATUS), np.float64, self.shm.buf[:n_status])
+        self.status.fill(0)
+        self.input_ring = SampleRing(INPUT_RING, memory=self.shm.buf[n_status:n_status + n_ring])
+        self.meter_tap = MeterTap(self.shm.buf[n_status + n_ring:n_status + n_ring + n_meter]) # read it with meters.MeterReader
+        ctx = mp.get_context("spawn") # a clean interpreter: nothing of Tk gets inherited
+        self.conn, child = ctx.Pipe()
+        self._lock = threading.Lock() # Connection.send is not thread-safe; the UI may send from timers
+        self.proc = ctx.Process(target=_serve, name="dsp", daemon=True,
+                                args=(child, self.shm.name, fs, block_size, xfade_ms, np.dtype(dtype).str, cpu))
+        _start_without_main(self.proc)
+
+    def send(self, *msg):
+        with self._lock:
+            try: self.conn.send(msg)
+            except (BrokenPipeError, OSError): pass # DSP process is gone; the status shows it
+
+    # --- the FXEngine calls the UI makes ---
+    def load_bank(self, db_file):
+        from presets import load_bank
+        self.presets = load_bank(db_file)
+        return self.presets
+
+    def load_preset(self, bank, slot):
+        self.state = self.presets[str(bank)][slot]
+        self._prepare(self.state)
+        self.send("preset", self.state, f"{bank}{slot}")
+        return self.state
+
+    def set_preset(self, state):
+        self.state = state
+        self._prepare(state)
+        self.send("preset", state, None)
+
+    def refresh(self):
+        self._prepare(self.state)
+        self.send("state", self.state)
+
+    def _prepare(self, state):
+        # IR work on this side, off the GIL the callback shares; a missing IR is the child's to skip
+        for kind, name in preset_irs(state):
+            try: cache_ir(kind, name, self.fs, self.block_size, self.dtype)
+            except (OSError, ValueError): pass
+
+    def reset(self):
+        self.send("reset")
+
+    @property
+    def bypass(self): return self._bypass
+    @bypass.setter
+    def bypass(self, v): self._bypass = v; self.send("bypass", v)
+
+    @property
+    def master_vol(self): return self._master_vol
+    @master_vol.setter
+    def master_vol(self, v): self._master_vol = v; self.send("master_vol", v)
+
+    def close(self):
+        self.send("stop")
+        self.proc.join(2.0)
+        if self.proc.is_alive(): self.proc.terminate()
+        self.shm.unlink()
+        try: self.shm.close()
+        except BufferError: pass # a reader (the tuner) still holds the ring; the mapping goes with the process
+
+
+class RemoteStats:
+    """The CallbackStats numbers the UI shows, read from shared memory."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __getattr__(self, name):
+        if name not in STATUS: raise AttributeError(name)
+        v = float(self.engine.status[STATUS.index(name)])
+        return v if name in ("load", "peak_load", "switch_last_ms", "switch_worst_ms", "switch_at_ns", "round_trip_ms", "nominal_ms") else int(v)
+
+    @property
+    def latency_ms(self):
+        return self.round_trip_ms or self.nominal_ms
+
+    def dump(self, path):
+        self.engine.send("dump", os.path.abspath(path)) # written by the DSP process
+
+
+class RemoteAudio:
+    """AudioStream stand-in: the stream itself is opened inside the DSP process."""
+
+    def __init__(self, engine, device=None):
+        self.engine = engine
+        self.device = device
+        self.stats = RemoteStats(engine)
+        self._mute = False
+        self._tap = None
+        self._meter = None
+
+    @property
+    def mute(self): return self._mute
+    @mute.setter
+    def mute(self, v): self._mute = v; self.engine.send("mute", v)
+
+    @property
+    def input_tap(self): return self._tap
+    @input_tap.setter
+    def input_tap(self, fn):
+        # any tap means "feed engine.input_ring"; read it with e.g. Tuner(fs, ring=engine.input_ring)
+        self._tap = fn; self.engine.send("tap", fn is not None)
+
+    @property
+    def meter(self): return self._meter
+    @meter.setter
+    def meter(self, tap):
+        # as with input_tap: any tap means "fill engine.meter_tap"
+        self._meter = tap; self.engine.send("meter", tap is not None)
+
+    def start(self):
+        self.engine.send("start", self.device)
+
+    def stop(self):
+        self.engine.close()
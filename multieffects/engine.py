@@ -0,0 +1,214 @@
+from time import perf_counter_ns
+import numpy as np
+from nodes import NODES
+from presets import load_bank, DEFAULT_CHAIN
+import kernels
+
+VOICES = 3 # node sets: the playing one, the one fading out / spilling its tail, and a clean spare
+SPILL_FLOOR = 1e-4 # -80 dBFS: a spilling tail quieter than this for `hold` samples is let go
+STAGE_NAMES = ("callback",) + tuple(NODES) + ("Spill",) # stats indices used by process_block
+
+class Snapshot:
+    """One preset compiled into the list of nodes the audio thread actually runs.
+
+    Built on the UI thread by FXEngine.compile() and never modified afterwards: the audio
+    thread picks up a whole new one through a single reference swap, so a block never sees
+    half of a slider move. chains[v] holds only the enabled nodes of voice v, in the preset's
+    order, as (stats index, node, params) with params already in linear gains / samples / codes;
+    tails[v] is the part of it from the first node with a tail (delay, reverb) onwards.
+    """
+
+    __slots__ = ("serial", "chains", "tails", "hold", "published_ns")
+
+    def __init__(self, serial, chains, tails, hold):
+        self.serial = serial # bumped by set_preset: a new serial means a preset switch, same serial a knob edit
+        self.chains = chains
+        self.tails = tails
+        self.hold = hold # samples of silence after which a spilling tail counts as finished
+        self.published_ns = perf_counter_ns()
+
+
+class Voice:
+    """A complete set of nodes, i.e. one preset's worth of DSP state."""
+
+    def __init__(self, fs, block_size, dtype):
+        self.nodes = {name: cls(fs, block_size, dtype) for name, cls in NODES.items()}
+        self.chain = self.tail = ()
+        self.hold = 0
+        self.spill = False # running its tail on silence after being switched away from
+        self.quiet = 0 # samples the spilling tail has stayed under SPILL_FLOOR
+
+    def reset(self):
+        for node in self.nodes.values(): node.reset()
+        self.spill = False; self.quiet = 0
+
+
+class FXEngine:
+    """The effect chain on its own, with no window or audio device attached.
+
+    The Tk UI, the headless pedal and the offline tools all drive one of these:
+    load a preset, then feed it blocks through process(). A preset switch moves to a
+    clean voice and crossfades over xfade_ms, while the old preset's delay and reverb
+    keep ringing out on their own voice.
+
+    All DSP runs in `dtype`: float64 for offline work, float32 for the live stream, where
+    process_into() takes the sounddevice buffers as they are and allocates nothing itself.
+    """
+
+    def __init__(self, fs=44100, block_size=1024, presets=None, xfade_ms=20.0, dtype=np.float64):
+        self.fs = fs
+        self.block_size = block_size
+        self.dtype = np.dtype(dtype)
+        self.master_vol = 0.8
+        self.bypass = False # IDLE: dry signal straight through at master volume
+        self.presets = presets # bank dict as read by presets.load_bank
+        self.state = None # the preset dict the UI edits
+        self.snap = None # compiled Snapshot of it, the only thing the audio thread reads
+        self.stats = None # monitor.CallbackStats, when the live stream wants per-stage timings
+        self.xfade_ms = xfade_ms
+        self.serial = 0
+        kernels.warm_up((self.dtype,)) # compiled loops (if numba is there) ready before the first block
+
+        # --- audio thread only from here ---
+        self.voices = [Voice(fs, block_size, self.dtype) for _ in range(VOICES)]
+        self.playing = None # the Snapshot process_block last picked up
+        self.voice = 0 # index of the voice playing it
+        self.outgoing = None # index of the voice being faded out, while a crossfade runs
+        self.fade_pos = self.fade_len = 0
+        self._in = np.empty(block_size, self.dtype)
+        self._old = np.empty(block_size, self.dtype)
+        self._tail = np.empty(block_size, self.dtype)
+        self._gain = np.empty(block_size, self.dtype)
+        self._ramp = np.arange(block_size, dtype=self.dtype)
+
+    # --- Presets ---
+    def load_bank(self, db_file):
+        self.presets = load_bank(db_file)
+        return self.presets
+
+    def load_preset(self, bank, slot):
+        self.set_preset(self.presets[str(bank)][slot])
+        if self.stats is not None: self.stats.set_preset(f"{bank}{slot}")
+        return self.state
+
+    def set_preset(self, state):
+        # state is the preset dict itself; the UI edits it and calls refresh() to be heard
+        self.state = state
+        self.serial += 1
+        self.refresh()
+
+    def refresh(self):
+        self.snap = self.compile(self.state)
+
+    def compile(self, state):
+        # the preset's "Chain" order; unknown names are skipped, nodes it doesn't mention run after it
+        nodes = self.voices[0].nodes
+        order = [n for n in state.get("Chain", DEFAULT_CHAIN) if n in nodes]
+        order += [n for n in nodes if n not in order]
+        active = [(STAGE_NAMES.index(n), n, nodes[n].compile(state)) for n in order if state.get(n, False)]
+        tails = [k for k, (_, n, p) in enumerate(active) if nodes[n].tail(p) > 0]
+        first = tails[0] if tails else len(active)
+        hold = max([nodes[n].tail(p) for _, n, p in active] + [0]) + self.block_size
+        for v in self.voices:
+            for _, n, p in active: v.nodes[n].prepare(p)
+        chains = tuple(tuple((i, v.nodes[n], p) for i, n, p in active) for v in self.voices)
+        return Snapshot(self.serial, chains, tuple(c[first:] for c in chains), hold)
+
+    def gate_gain(self):
+        # the playing voice's gate on its last block, 1.0 = open or not in the chain (meters)
+        v = self.voices[self.voice]; gate = v.nodes["Gate"]
+        for _, node, _ in v.chain:
+            if node is gate: return gate.gain
+        return 1.0
+
+    def reset(self):
+        # forget everything still ringing in the delay lines and filters
+        for v in self.voices: v.reset()
+        self.outgoing = None
+
+    # --- Processing ---
+    def process(self, block):
+        # block: mono samples or (frames, channels) with the guitar on channel 0, any length.
+        # Returns a new mono block in the engine's dtype; the input is never modified.
+        sig = block[:, 0] if np.ndim(block) > 1 else block
+        if self.bypass:
+            return np.asarray(sig, dtype=self.dtype) * self.master_vol
+        out = np.empty(len(sig), self.dtype)
+        for s in range(0, len(sig), self.block_size):
+            out[s:s + self.block_size] = self.process_block(np.array(sig[s:s + self.block_size], dtype=self.dtype))
+        return out
+
+    def process_into(self, indata, outdata):
+        # live path: indata (frames, channels) with the guitar on channel 0, frames <= block_size;
+        # the result goes to every channel of outdata. Nothing is allocated here.
+        buf = self._in[:len(indata)]
+        buf[:] = indata[:, 0]
+        if self.bypass: buf *= self.master_vol
+        else: buf = self.process_block(buf)
+        outdata[:] = buf[:, None]
+
+    def process_block(self, sig):
+        # sig is a float block of at most block_size samples and may be modified in place
+        snap = self.snap; stats = self.stats # read once: a refresh() mid-block takes effect next block
+        if snap is not self.playing: self._pick_up(snap)
+        n = len(sig)
+        if self.outgoing is not None:
+            old = self._old[:n]; old[:] = sig
+        t = perf_counter_ns() if stats is not None else 0
+        for i, node, params in self.voices[self.voice].chain:
+            sig = node.process(sig, params)
+            if stats is not None: t = stats.mark(i, t)
+
+        if self.outgoing is not None: # crossfade: new * g + old * (1 - g), g ramping 0 -> 1
+            v = self.voices[self.outgoing]
+            for _, node, params in v.chain: old = node.process(old, params)
+            g = self._gain[:n]
+            np.add(self._ramp[:n], self.fade_pos, out=g); g *= 1.0 / self.fade_len; np.clip(g, 0.0, 1.0, out=g)
+            sig -= old; sig *= g; sig += old
+            self.fade_pos += n
+            if self.fade_pos >= self.fade_len:
+                self._spill(v); self.outgoing = None
+        for v in self.voices:
+            if v.spill: sig = self._run_tail(v, sig)
+        if stats is not None: stats.mark(len(STAGE_NAMES) - 1, t)
+        sig *= self.master_vol
+        return np.clip(sig, -1, 1, out=sig)
+
+    def _pick_up(self, snap):
+        old, self.playing = self.playing, snap
+        if old is None or snap.serial == old.serial:
+            # first preset or a knob edit: same voice, but nodes that just got switched on start clean
+            v = self.voices[self.voice]
+            was_on = [node for _, node, _ in v.chain]
+            for _, node, _ in snap.chains[self.voice]:
+                if node not in was_on: node.reset()
+            v.chain, v.tail, v.hold = snap.chains[self.voice], snap.tails[self.voice], snap.hold
+            return
+        # preset switch
+        if self.outgoing is not None: # switched again mid-fade: the one fading out goes straight to its tail
+            self._spill(self.voices[self.outgoing])
+        free = [k for k, v in enumerate(self.voices) if k != self.voice and not v.spill]
+        if free:
+            k = free[0]
+        else: # every other voice is still spilling: cut the one closest to done
+            k = max((k for k in range(VOICES) if k != self.voice), key=lambda k: self.voices[k].quiet)
+            self.voices[k].reset()
+        nv = self.voices[k] # voices are reset when they are let go, so this one is already clean
+        nv.chain, nv.tail, nv.hold = snap.chains[k], snap.tails[k], snap.hold
+        self.outgoing, self.voice = self.voice, k
+        self.fade_pos = 0; self.fade_len = max(1, int(self.xfade_ms * self.fs / 1000))
+        if self.stats is not None:
+            now = perf_counter_ns(); self.stats.record_switch(now - snap.published_ns, now)
+
+    def _spill(self, v):
+        if v.tail: v.spill = True; v.quiet = 0
+        else: v.reset()
+
+    def _run_tail(self, v, sig):
+        t = self._tail[:len(sig)]; t.fill(0)
+        for _, node, params in v.tail: t = node.process(t, params)
+        sig += t
+        np.abs(t, out=t)
+        v.quiet = v.quiet + len(sig) if t.max() < SPILL_FLOOR else 0
+        if v.quiet >= v.hold: v.reset() # done: clean for the next switch
+        return sig
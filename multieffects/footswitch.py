@@ -0,0 +1,89 @@
+import queue
+from time import perf_counter_ns
+from presets import DEFAULT_CHAIN
+
+# --- TM1638 footswitch board -> the same actions as the touchscreen ---
+#
+# Key edges come off the driver's scan thread on a queue. poll() drains it on whichever thread
+# owns the app (Tk's after() loop, headless's main loop) and calls the host's actions there,
+# exactly as a touchscreen press would; nothing here goes near the audio thread.
+#
+#   PRESET page   keys 1-4 presets A-D, 5 / 6 bank down / up, 7 tuner, 8 FX page
+#   FX page       keys 1-5 Amp / Gate / Mod / Dly / Rev on/off, 7 tuner, 8 back to PRESET
+#
+# LEDs 1-5 always show which effects are on, 7 the tuner, 8 the FX page.
+
+PRESET_KEYS = ("A", "B", "C", "D")
+FX_KEYS = tuple(DEFAULT_CHAIN) # fixed key per effect, whatever order the preset chains them in
+PREV_BANK, NEXT_BANK, TUNER, FX_PAGE = 4, 5, 6, 7
+TRACE_TIMEOUT_NS = 1_000_000_000 # a press that didn't switch presets (e.g. back to IDLE) stops being traced after this
+
+class Footswitch:
+    """Routes board keys to host actions and mirrors the host's state onto the board.
+
+    actions: "preset"(slot), "prev_bank"(), "next_bank"(), "tuner"(), "fx"(name); missing
+    ones are ignored. stats: the audio stats (CallbackStats or dspproc.RemoteStats), whose
+    switch_at_ns gives the moment the DSP picked a preset up, for the key -> sound trace.
+    """
+
+    def __init__(self, board, actions, stats=None, budget_ms=30.0):
+        self.board = board
+        self.actions = actions
+        self.stats = stats
+        self.budget_ms = budget_ms
+        self.fx_page = False
+        self._edge_ns = 0 # debounced key edge of a preset change the DSP hasn't picked up yet
+        self._shown = ("", (), False)
+        self.latency_last_ms = self.latency_worst_ms = self.latency_total_ms = 0.0
+        self.latency_count = self.over_budget = 0
+
+    def poll(self, timeout=0):
+        # handle every queued key edge; with timeout > 0 wait that long for the first one
+        try:
+            while True:
+                key, pressed, t = self.board.events.get(timeout=timeout) if timeout else self.board.events.get_nowait()
+                timeout = 0
+                if pressed: self.handle(key, t)
+        except queue.Empty: pass
+        self.trace()
+
+    def handle(self, key, t):
+        if key == FX_PAGE: self.fx_page = not self.fx_page; self.show(*self._shown); return
+        if key == TUNER: self.run("tuner"); return
+        if self.fx_page:
+            if key < len(FX_KEYS): self.run("fx", FX_KEYS[key])
+            return
+        if key < len(PRESET_KEYS): self._edge_ns = t; self.run("preset", PRESET_KEYS[key])
+        elif key == PREV_BANK: self._edge_ns = t; self.run("prev_bank")
+        elif key == NEXT_BANK: self._edge_ns = t; self.run("next_bank")
+
+    def run(self, name, *args):
+        fn = self.actions.get(name)
+        if fn is not None: fn(*args)
+
+    def trace(self):
+        # key edge -> the callback picking the new preset up; both are perf_counter_ns, i.e.
+        # CLOCK_MONOTONIC, so this holds with the DSP in another process too
+        if not self._edge_ns or self.stats is None: return
+        at = self.stats.switch_at_ns
+        if at >= self._edge_ns:
+            ms = (at - self._edge_ns) / 1e6
+            self.latency_last_ms = ms; self.latency_total_ms += ms; self.latency_count += 1
+            self.latency_worst_ms = max(self.latency_worst_ms, ms)
+            if ms > self.budget_ms: self.over_budget += 1
+            self._edge_ns = 0
+        elif perf_counter_ns() - self._edge_ns > TRACE_TIMEOUT_NS: self._edge_ns = 0
+
+    def show(self, text, fx_on=(), tuner=False):
+        # the host calls this after every refresh; the driver only sends what changed
+        self._shown = (text, fx_on, tuner)
+        leds = [k in fx_on for k in FX_KEYS] + [False, tuner, self.fx_page]
+        self.board.set_text(text, flush=False); self.board.set_leds(leds)
+
+    def summary(self):
+        n = self.latency_count
+        return (f"footswitch -> DSP: {n} switches, last {self.latency_last_ms:.1f} ms, worst {self.latency_worst_ms:.1f} ms, "
+                f"mean {self.latency_total_ms / n if n else 0.0:.1f} ms, {self.over_budget} over {self.budget_ms:.0f} ms")
+
+    def close(self):
+        self.board.close()
@@ -0,0 +1,109 @@
+import argparse
+import time
+import numpy as np
+from engine import FXEngine
+from audio import AudioStream, RATES, list_devices, probe_block_size
+from presets import load_bank, step_bank, DEFAULT_CHAIN, SLOTS
+
+# Headless pedal build: no display, no customtkinter. Loads a preset and runs the live stream,
+# optionally played from the TM1638 footswitch board (see footswitch.py for the key layout).
+#
+#   python headless.py --preset 1A --footswitch
+#   python headless.py --device "USB Audio" --fs 48000 --block auto
+
+BLOCK_CACHE = "block_size.json" # --block auto's results; delete it to probe again
+
+class Pedal:
+    """The touchscreen actions the footswitch needs, on a bare engine (edits aren't saved)."""
+
+    def __init__(self, engine, audio, bank, slot):
+        self.engine = engine
+        self.audio = audio
+        self.bank, self.slot = bank, slot
+        self.tuner = None
+        self.footswitch = None
+
+    def select(self, slot): self.slot = slot; self.engine.bypass = False; self.engine.load_preset(self.bank, slot); self.show()
+    def preset(self, slot):
+        if slot == self.slot and not self.engine.bypass: self.engine.bypass = True; self.show()
+        else: self.select(slot)
+    def next_bank(self): self.bank = step_bank(self.engine.presets, self.bank, 1); self.select(self.slot)
+    def prev_bank(self): self.bank = step_bank(self.engine.presets, self.bank, -1); self.select(self.slot)
+    def fx(self, k): self.engine.state[k] = not self.engine.state.get(k, False); self.engine.refresh(); self.show()
+
+    def toggle_tuner(self):
+        if self.tuner is None:
+            from tuner import Tuner
+            self.tuner = Tuner(self.engine.fs); self.tuner.start()
+            self.audio.input_tap = self.tuner.tap; self.audio.mute = True
+        else:
+            self.audio.input_tap = None; self.audio.mute = False
+            self.tuner.stop(); self.tuner = None
+        self.show()
+
+    def actions(self):
+        return {"preset": self.preset, "prev_bank": self.prev_bank, "next_bank": self.next_bank, "tuner": self.toggle_tuner, "fx": self.fx}
+
+    def show(self):
+        if self.footswitch is None: return
+        state = self.engine.state
+        if self.tuner is not None: text = f"t {self.tuner.note}" if self.tuner.note != "-" else "tunEr"
+        elif self.engine.bypass: text = f"{self.bank}{self.slot} --"
+        else: text = f"{self.bank}{self.slot} {state.get('Name', '')}"
+        self.footswitch.show(text, [k for k in DEFAULT_CHAIN if state.get(k)], self.tuner is not None)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run SunsetZ MTFX-01 without the touchscreen UI.")
+    ap.add_argument("--db", default="presets.db", help="preset store (presetdb.py), or a JSON bank file")
+    ap.add_argument("--preset", default="1A", help="bank and slot, e.g. 3C")
+    ap.add_argument("--device", help="index or part of the name (see --list-devices); default: the system's")
+    ap.add_argument("--list-devices", action="store_true")
+    ap.add_argument("--fs", type=int, default=44100, choices=RATES)
+    ap.add_argument("--block", default="auto", help="frames per callback, or auto: with every effect on, smallest stable of 256 / 128 / 64, else 512, else 1024, "
+                    f"probed once per device and rate (kept in {BLOCK_CACHE})")
+    ap.add_argument("--xfade", type=float, default=20.0, help="preset switch crossfade in ms")
+    ap.add_argument("--stats", help="write the callback stats (xruns, stage timings, load per preset) here on exit")
+    ap.add_argument("--footswitch", action="store_true", help="take presets / FX / tuner from the TM1638 board")
+    ap.add_argument("--pins", type=int, nargs=3, default=(17, 27, 22), metavar=("DIO", "CLK", "STB"), help="TM1638 BCM pins")
+    args = ap.parse_args()
+    if args.list_devices: print("\n".join(list_devices())); return
+
+    store = load_bank(args.db)
+    bank, slot = args.preset[:-1], args.preset[-1:].upper()
+    if bank not in store or slot not in SLOTS: ap.error(f"no preset {args.preset} in {args.db} (banks: {' '.join(store)}, slots: {' '.join(SLOTS)})")
+    block = probe_block_size(args.fs, store[bank][slot], args.device, cache=BLOCK_CACHE) if args.block == "auto" else int(args.block)
+    engine = FXEngine(args.fs, block, store, xfade_ms=args.xfade, dtype=np.float32)
+    engine.load_preset(bank, slot)
+    audio = AudioStream(engine, args.device)
+    pedal = Pedal(engine, audio, bank, slot)
+    if args.footswitch:
+        from tm1638 import TM1638
+        from footswitch import Footswitch
+        try:
+            board = TM1638(*args.pins)
+        except (ImportError, RuntimeError) as e:
+            print(f"Footswitch Error: {e}"); board = None
+        if board is not None:
+            pedal.footswitch = Footswitch(board, pedal.actions(), audio.stats)
+            pedal.show()
+            board.start_scan()
+    audio.start()
+    print(f"Running preset {args.preset.upper()}: {engine.state.get('Name', '')} at {args.fs} Hz, block {block} (Ctrl+C to stop)")
+    try:
+        while True:
+            if pedal.footswitch is None: time.sleep(1); continue
+            pedal.footswitch.poll(timeout=0.1) # wakes as soon as a key edge is queued
+            if pedal.tuner is not None: pedal.show()
+    except KeyboardInterrupt: pass
+    finally:
+        audio.stop()
+        if pedal.tuner is not None: pedal.tuner.stop()
+        if pedal.footswitch is not None: pedal.footswitch.close(); print(pedal.footswitch.summary())
+        st = audio.stats
+        print(f"{st.blocks} blocks, DSP load {st.load:.0%} (peak {st.peak_load:.0%}), {st.xruns} xruns, {st.deadline_misses} missed deadlines, {st.exceptions} exceptions, "
+              f"round trip {st.latency_ms:.1f} ms{'' if st.round_trip_ms else ' (nominal)'}")
+        if args.stats: st.dump(args.stats)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import numpy as np
+
+# --- Optional compiled inner loops for the sample-recursive stages ---
+#
+# Feedback shorter than a block (the flanger, short delays at big block sizes) and one-pole
+# filters (the gate's envelope and gain, the reverb's damping) are a loop over samples at
+# heart; NumPy gets there by cutting blocks into sub-blocks, with the cumulative-sum trick in
+# dsp.OnePole or with the prefix scan in dsp.Reverb. With numba installed the loops below are
+# compiled as they are written and the callers use them while ENABLED; without it ENABLED is
+# False and the NumPy paths run, nothing else changes.
+#
+# Compiled code is cached on disk (__pycache__ next to this file), and warm_up() compiles or
+# loads every signature the engine uses when an engine is built, so the callback never waits
+# on the compiler.
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+AVAILABLE = njit is not None
+ENABLED = AVAILABLE # read per block by the callers; bench.py --kernels flips it
+
+def _compiled(fn):
+    return njit(cache=True, nogil=True)(fn) if AVAILABLE else fn
+
+@_compiled
+def delay_feedback(buf, ptr, x, delay, fb, out):
+    # DelayLine.process a sample at a time: read delay[i] samples behind the write slot (linear
+    # interpolation) into out[i], write x[i] + out[i] * fb there. Returns the new write pointer.
+    size = buf.shape[0]
+    for i in range(x.shape[0]):
+        pos = ptr - delay[i]
+        i0 = int(np.floor(pos)); frac = pos - i0
+        i0 %= size; i1 = i0 + 1
+        if i1 == size: i1 = 0
+        y = buf[i0] + (buf[i1] - buf[i0]) * frac
+        out[i] = y
+        buf[ptr] = x[i] + y * fb
+        ptr += 1
+        if ptr == size: ptr = 0
+    return ptr
+
+@_compiled
+def one_pole(x, out, c, y):
+    # y[n] = c * y[n-1] + (1 - c) * x[n]; returns the last y
+    g = 1.0 - c
+    for i in range(x.shape[0]):
+        y = c * y + g * x[i]
+        out[i] = y
+    return y
+
+@_compiled
+def one_pole_cols(x, out, b, p, y):
+    # out[n, i] = p[i] * out[n-1, i] + b[i] * x[n, i] for each column i; y holds the state in and out
+    for n in range(x.shape[0]):
+        for i in range(x.shape[1]):
+            y[i] = p[i] * y[i] + b[i] * x[n, i]
+            out[n, i] = y[i]
+
+def warm_up(dtypes=(np.float32, np.float64)):
+    # every signature the nodes call with, for blocks in these sample dtypes
+    if not ENABLED: return
+    for dt in dtypes:
+        x = np.zeros(4, dt)
+        delay_feedback(np.zeros(16, dt), 0, x, np.full(4, 2.5), 0.5, np.empty(4, dt))
+        c = np.zeros(2, dt); one_pole_cols(np.zeros((4, 2), dt), np.empty((4, 2), dt), c, c, c.copy())
+    one_pole(np.zeros(4), np.empty(4), 0.5, 0.0) # the gate runs its followers in float64
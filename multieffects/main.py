@@ -1,13 +1,34 @@
+from time import perf_counter
+import tkinter as tk
 import customtkinter as ctk
 import numpy as np
-import sounddevice as sd
-import json
-import os
-from scipy.signal import lfilter
+from engine import FXEngine
+from audio import AudioStream, probe_block_size
+from dspproc import RemoteEngine, RemoteAudio
+from presets import load_bank, step_bank, DEFAULT_CHAIN
+from persistence import PresetWriter
+from presetdb import PresetStore
+from tuner import Tuner
+from meters import MeterTap, MeterReader
+from tm1638 import TM1638
+from footswitch import Footswitch
+from waveshaper import DRIVE_MODES
+from convolver import list_irs
 
 # --- Configuration ---
-FS = 44100
-BLOCK_SIZE = 1024 
+FS = 44100 # 44100, 48000 or 96000
+BLOCK_SIZE = "auto" # frames per callback, or "auto": with every effect on, down from 256 to 128 / 64 while it runs without xruns, or up to 512 when 256 doesn't, else 1024 (audio.probe_block_size)
+BLOCK_CACHE = "block_size.json" # what "auto" found, per device and rate: probed on the first run only (delete to probe again)
+DEVICE = None # sound card: index, part of its name (e.g. "USB Audio"), or None for the system default
+XFADE_MS = 20 # preset switch crossfade; delay / reverb tails of the old preset ring out on top
+DTYPE = np.float32 # what sounddevice hands us; the whole chain stays in it
+DSP_PROCESS = True # stream + DSP in their own process (dspproc.py) so UI redraws can't cause xruns
+FOOTSWITCH = True # TM1638 board on the GPIO header; skipped with a message without RPi.GPIO or when no board answers a key scan
+TM1638_PINS = (17, 27, 22) # BCM dio, clk, stb
+FOOTSWITCH_POLL_MS = 5
+METER_FPS = 60
+METER_W, SPECTRUM_BANDS = 150, 32 # px of level bars, bars of spectrum (5 px each)
+VIEWS = ("preset", "live", "setup_gate", "setup_amp", "setup_mod", "setup_dly", "setup_rev", "tuner")
 
 class ChocolateMultiFX_Pro(ctk.CTk):
     def __init__(self):
@@ -18,223 +39,118 @@ class ChocolateMultiFX_Pro(ctk.CTk):
         self.configure(fg_color="#1e1b18")
 
         # --- Data & State ---
-        self.db_file = "bank_presets_pro.json"
-        self.current_bank = 1
+        self.db_file = "presets.db" # created from bank_presets_pro.json on first run (presetdb.py)
+        self.stats_file = "dsp_stats.json"
+        self.last_xruns = self.last_exceptions = 0
+        self.all_data = load_bank(self.db_file)
+        self.current_bank = next(iter(self.all_data)) # bank names are the store's, in its order
         self.active_preset = "A"
+
+        # --- DSP Engine (audio-side state lives there, not in the UI) ---
+        # the probe runs in this process before the DSP one exists; the device is free again after it
+        block = BLOCK_SIZE if BLOCK_SIZE != "auto" else probe_block_size(FS, self.all_data[self.current_bank][self.active_preset], DEVICE, DTYPE, cache=BLOCK_CACHE)
+        if DSP_PROCESS:
+            self.engine = RemoteEngine(FS, block, self.all_data, xfade_ms=XFADE_MS, dtype=DTYPE)
+            self.audio = RemoteAudio(self.engine, DEVICE)
+        else:
+            self.engine = FXEngine(FS, block, self.all_data, xfade_ms=XFADE_MS, dtype=DTYPE)
+            self.audio = AudioStream(self.engine, DEVICE)
+
         self.is_idle = True
         self.is_live_mode = False 
         self.is_tuner_mode = False 
+        self.tuner_job = None # the pending after() of update_tuner_ui_loop, so there is only ever one
         self.current_view = "Main"
-        self.master_vol = 0.8
+        self.views = {} # view key -> its frame, built once (see VIEWS / refresh_ui)
+        self.shown_view = None
+        self._shown = {} # widget -> the options set_w last gave it
+        self.ui_last_ms = self.ui_worst_ms = 0.0 # refresh_ui call -> screen redrawn
         
         self.fx_colors = {
             "Gate": "#ff9500", "Amp": "#ff4d4d", "Mod": "#4dff4d", "Dly": "#4d4dff", "Rev": "#b34dff"
         }
 
-        # Tuner Data
-        self.current_note = "-"
-        self.tuning_diff = 0
-        self.notes = {"E2": 82.4, "A2": 110.0, "D3": 146.8, "G3": 196.0, "B3": 246.9, "E4": 329.6}
-
-        self.all_data = self.load_data()
-        self.current_state = self.all_data[str(self.current_bank)][self.active_preset]
+        # Tuner (pitch detection runs on its own thread, the callback only feeds it samples)
+        self.tuner = Tuner(FS, ring=getattr(self.engine, "input_ring", None))
 
-        # --- DSP Variables ---
-        self.mod_buffer = np.zeros(8192)
-        self.mod_ptr = 0
-        self.lfo_phase = 0
-        self.delay_buffer = np.zeros(FS + BLOCK_SIZE)
-        self.rev_buffer = np.zeros(int(FS * 0.15) + BLOCK_SIZE)
-
-        # Filter States
-        self.bass_state = np.zeros(2)
-        self.mid_state = np.zeros(2)
-        self.treble_state = np.zeros(2)
+        self.current_state = self.engine.load_preset(self.current_bank, self.active_preset)
+        self.writer = PresetWriter(self.db_file, self.all_data, store=self.all_data if isinstance(self.all_data, PresetStore) else None)
 
+        self.footswitch = None
         self.setup_ui()
+        self.start_footswitch()
         self.start_audio_stream()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
-    def load_data(self):
-        if os.path.exists(self.db_file):
-            try:
-                with open(self.db_file, 'r') as f:
-                    data = json.load(f)
-                    for b in data:
-                        for p in data[b]:
-                            if "Gate" not in data[b][p]: data[b][p]["Gate"] = False
-                            if "Rev_Params" not in data[b][p]:
-                                data[b][p]["Rev_Params"] = {"Size": 50, "Damp": 30, "Mix": 20}
-                            if "Warmth" not in data[b][p]["Amp_Params"]: data[b][p]["Amp_Params"]["Warmth"] = 0
-                            if "Notes" not in data[b][p]: data[b][p]["Notes"] = ""
-                    return data
-            except: pass
-        return {str(b): {l: {
-            "Name": "", "Gate": False, "Amp": False, "Mod": False, "Dly": False, "Rev": False,
-            "Gate_Threshold": -45, "Notes": "",
-            "Amp_Params": {"Vol": 50, "Gain": 30, "Bas": 50, "Mid": 50, "Tre": 50, "Drive_Mode": "Clean", "Warmth": 0},
-            "Mod_Params": {"Type": "Chorus", "Rate": 1.5, "Depth": 50},
-            "Dly_Params": {"Time": 300, "Feedback": 30, "Mix": 30},
-            "Rev_Params": {"Size": 50, "Damp": 30, "Mix": 20}
-        } for l in ["A", "B", "C", "D"]} for b in range(1, 10)}
+    # IDLE is the engine's bypass, so the UI flag and what the audio thread does can't drift apart
+    @property
+    def is_idle(self): return self.engine.bypass
+    @is_idle.setter
+    def is_idle(self, v): self.engine.bypass = v
 
     def save_data(self):
-        with open(self.db_file, 'w') as f: json.dump(self.all_data, f)
-
-    # --- THE ENGINE ---
-    def audio_callback(self, indata, outdata, frames, time, status):
-        try:
-            sig = indata[:, 0].copy()
-
-            # --- 1. Tuner & Idle Logic ---
-            if self.is_tuner_mode:
-                crossings = np.where(np.diff(np.sign(sig)))[0]
-                if len(crossings) > 0:
-                    freq = (len(crossings) * FS) / (2 * frames)
-                    if freq > 60: self.process_tuner(freq)
-                outdata.fill(0)
-                return
-
-            if self.is_idle:
-                outdata[:, 0] = outdata[:, 1] = sig * self.master_vol
-                return
-
-            # --- 2. Amplifier (Simplified) ---
-            if self.current_state.get("Amp", False):
-                p = self.current_state["Amp_Params"]
-                mode = p.get("Drive_Mode", "Clean")
-                gain_val = (p["Gain"] / 10) + 1.0
-                
-                if mode == "Clean":
-                    sig = sig * (1.0 + gain_val * 1.5)
-                    warmth = p.get("Warmth", 0) / 100.0
-                    if warmth > 0:
-                        # Soft Sign: ช่วยบีบอัดสัญญาณที่ถูกขยายมาให้โค้งมน ไม่ Clip แข็ง
-                        sig = sig / (1 + warmth * np.abs(sig))
-                    
-                    # ชดเชย Volume เพื่อให้เสียง Clean ไม่ดังทะลุเพดาน
-                    sig *= 0.8
-                        
-                elif mode == "Overdrive 1":
-                    sig = np.tanh(sig * (gain_val + 2.0))
-                elif mode == "Overdrive 2":
-                    sig = (2 / np.pi) * np.arctan(sig * (gain_val * 2.0))
-                elif mode == "Distortion":
-                    sig = np.clip(sig * (gain_val + 2.0), -0.5, 0.5) * 1.5
-                elif mode == "Fuzz":
-                    sig = np.sign(sig) * (1 - np.exp(-np.abs(sig * (p["Gain"] * 0.8))))
-
-                # --- 3-Band EQ (Biquad) ---
-                sig, self.bass_state = self.apply_shelf_filter(sig, 250, p["Bas"], "low", self.bass_state)
-                sig, self.mid_state = self.apply_peaking_filter(sig, 1000, p["Mid"], 1.0, self.mid_state)
-                sig, self.treble_state = self.apply_shelf_filter(sig, 5000, p["Tre"], "high", self.treble_state)
-                sig *= (p["Vol"] / 100)
-
-            # --- 3. Noise Gate (Post-Amp) ---
-            if self.current_state.get("Gate", False):
-                thresh = 10**(self.current_state.get("Gate_Threshold", -45) / 20)
-                sig[np.abs(sig) < thresh] = 0
-
-            # --- 4. Modulation (Original Stable Version) ---
-            if self.current_state.get("Mod", False):
-                m = self.current_state["Mod_Params"]
-                t = (np.arange(frames) + self.lfo_phase) / FS
-                lfo = np.sin(2 * np.pi * m["Rate"] * t)
-                depth = m["Depth"] / 100.0
-                
-                is_flg = (m["Type"] == "Flanger")
-                base, m_rng, fb = (50, 40, 0.5) if is_flg else (200, 100, 0.0)
-                
-                for i in range(frames):
-                    d_val = base + (lfo[i] * m_rng)
-                    r_ptr = int(self.mod_ptr - d_val) % len(self.mod_buffer)
-                    d_smp = self.mod_buffer[r_ptr]
-                    self.mod_buffer[self.mod_ptr] = sig[i] + (d_smp * fb)
-                    sig[i] = (sig[i] * (1 - depth)) + (d_smp * depth)
-                    self.mod_ptr = (self.mod_ptr + 1) % len(self.mod_buffer)
-                
-                self.lfo_phase = (self.lfo_phase + frames) % FS
-
-            # --- 5. Delay & Reverb ---
-            if self.current_state.get("Dly", False):
-                d = self.current_state["Dly_Params"]
-                d_smp = int((d["Time"] / 1000.0) * FS)
-                idx = (np.arange(frames) + len(self.delay_buffer) - d_smp - frames) % len(self.delay_buffer)
-                delayed_part = self.delay_buffer[idx]
-                self.delay_buffer[-frames:] = sig + (delayed_part * (d["Feedback"]/100))
-                self.delay_buffer = np.roll(self.delay_buffer, -frames)
-                sig = (sig * (1 - d["Mix"]/100)) + (delayed_part * d["Mix"]/100)
-
-            if self.current_state.get("Rev", False):
-                rv = self.current_state["Rev_Params"]
-                size, mix = rv["Size"]/100.0 * 0.85, rv["Mix"]/100.0
-                rev_idx = (np.arange(frames) + len(self.rev_buffer) - 1500 - frames) % len(self.rev_buffer)
-                rev_part = self.rev_buffer[rev_idx]
-                self.rev_buffer[-frames:] = sig + (rev_part * size)
-                self.rev_buffer = np.roll(self.rev_buffer, -frames)
-                sig = (sig * (1 - mix)) + (rev_part * mix)
-
-            sig = np.clip(sig * self.master_vol, -1, 1)
-            outdata[:, 0] = outdata[:, 1] = sig
-            
-        except Exception as e:
-            outdata.fill(0)
-
-    # --- DSP Helpers (Filters) ---
-    def iir_filter(self, x, b, a, state):
-        y, next_state = lfilter(b, a, x, zi=state)
-        return y, next_state
-
-    def apply_shelf_filter(self, data, freq, gain_pos, shelf_type, state):
-        gain_db = (gain_pos - 50) / 50 * 20
-        A = 10**(gain_db / 40); omega = 2 * np.pi * freq / FS; sn = np.sin(omega); cs = np.cos(omega)
-        beta = np.sqrt((A**2 + 1) / 0.7 - (A - 1)**2) / 2
-        if beta < 0: beta = 0
-        if shelf_type == "low":
-            b = np.array([A*((A+1)-(A-1)*cs+2*beta*sn), 2*A*((A-1)-(A+1)*cs), A*((A+1)-(A-1)*cs-2*beta*sn)])
-            a = np.array([(A+1)+(A-1)*cs+2*beta*sn, -2*((A-1)+(A+1)*cs), (A+1)+(A-1)*cs-2*beta*sn])
-        else:
-            b = np.array([A*((A+1)+(A-1)*cs+2*beta*sn), -2*A*((A-1)+(A+1)*cs), A*((A+1)+(A-1)*cs-2*beta*sn)])
-            a = np.array([(A+1)-(A-1)*cs+2*beta*sn, 2*((A-1)-(A+1)*cs), (A+1)-(A-1)*cs-2*beta*sn])
-        return self.iir_filter(data, b/a[0], a/a[0], state)
-
-    def apply_peaking_filter(self, data, freq, gain_pos, Q, state):
-        gain_db = (gain_pos - 50) / 50 * 18; A = 10**(gain_db / 40); omega = 2 * np.pi * freq / FS; alpha = np.sin(omega)/(2*Q); cs = np.cos(omega)
-        b = np.array([1+alpha*A, -2*cs, 1-alpha*A]); a = np.array([1+alpha/A, -2*cs, 1-alpha/A])
-        return self.iir_filter(data, b/a[0], a/a[0], state)
+        # every edit ends up here: recompile the preset for the audio thread, then queue the file write.
+        # Both are cheap enough for every slider tick (coefficients are cached, the writer coalesces).
+        self.engine.refresh()
+        self.writer.mark_dirty(self.current_bank, self.active_preset, self.current_state)
+
+    def on_close(self):
+        self.audio.stop()
+        self.tuner.stop()
+        if self.footswitch: self.footswitch.close()
+        self.writer.close() # flush anything still pending before we go
+        self.destroy()
 
     # --- UI Helpers & Screens ---
     def save_notes(self):
         self.current_state["Notes"] = self.notes_text.get("0.0", "end-1c")
         self.save_data()
 
-    def process_tuner(self, freq):
-        closest = "-"; min_diff = float('inf')
-        for n, t in self.notes.items():
-            diff = freq - t
-            if abs(diff) < abs(min_diff): min_diff = diff; closest = n
-        self.current_note = closest; self.tuning_diff = min_diff
-
     def toggle_tuner(self):
         self.is_tuner_mode = not self.is_tuner_mode
+        self.audio.input_tap = self.tuner.tap if self.is_tuner_mode else None
+        self.audio.mute = self.is_tuner_mode
+        if self.is_tuner_mode: self.tuner.start()
+        else: self.tuner.stop()
         self.tuner_btn.configure(text=f"TUNER: {'ON' if self.is_tuner_mode else 'OFF'}", fg_color="#ff4d4d" if self.is_tuner_mode else "#2d2620")
         self.refresh_ui()
+        if self.tuner_job is not None: self.after_cancel(self.tuner_job); self.tuner_job = None
+        if self.is_tuner_mode: self.update_tuner_ui_loop()
 
-    def next_bank(self): self.current_bank = 1 if self.current_bank >= 9 else self.current_bank + 1; self.select_preset(self.active_preset)
-    def prev_bank(self): self.current_bank = 9 if self.current_bank <= 1 else self.current_bank - 1; self.select_preset(self.active_preset)
-    def on_bank_change(self, c): self.current_bank = int(c); self.select_preset(self.active_preset)
+    def next_bank(self): self.current_bank = step_bank(self.all_data, self.current_bank, 1); self.select_preset(self.active_preset)
+    def prev_bank(self): self.current_bank = step_bank(self.all_data, self.current_bank, -1); self.select_preset(self.active_preset)
+    def on_bank_change(self, c): self.current_bank = c; self.select_preset(self.active_preset)
     def on_preset_change(self, c): self.select_preset(c)
     def on_name_submit(self, e): self.current_state["Name"] = self.name_entry.get(); self.save_data(); self.refresh_ui(); self.focus()
     def toggle_mode(self): self.is_live_mode = not self.is_live_mode; self.is_idle = False; self.mode_btn.configure(text=f"MODE: {'LIVE' if self.is_live_mode else 'PRESET'}"); self.refresh_ui()
     def go_back(self): self.current_view = "Main"; self.refresh_ui()
     def go_to_setup(self, k): self.current_view = f"Setup_{k}"; self.refresh_ui()
+    def chain(self, state=None):
+        ch = list((state or self.current_state).get("Chain", DEFAULT_CHAIN))
+        return ch + [k for k in DEFAULT_CHAIN if k not in ch]
+    def move_fx(self, k, step):
+        ch = self.chain(); i = ch.index(k); j = i + step
+        if 0 <= j < len(ch): ch[i], ch[j] = ch[j], ch[i]; self.current_state["Chain"] = ch; self.save_data(); self.refresh_ui()
     def toggle_fx(self, k): self.current_state[k] = not self.current_state.get(k, False); self.save_data(); self.refresh_ui()
-    def update_master_vol(self, v): self.master_vol = float(v)
+    def update_master_vol(self, v): self.engine.master_vol = float(v)
     
     def on_drive_mode_change(self, c):
         self.current_state["Amp_Params"]["Drive_Mode"] = c
         self.save_data()
         self.refresh_ui()
     
+    def on_oversample_change(self, c):
+        self.current_state["Amp_Params"]["Oversample"] = int(c.rstrip("x"))
+        self.save_data()
+
+    def on_cab_change(self, c):
+        self.current_state["Amp_Params"]["Cab"] = "" if c == "Off" else c
+        self.save_data()
+
+    def on_room_change(self, c):
+        self.current_state["Rev_Params"]["IR"] = "" if c == "Algorithmic" else c
+        self.save_data()
+
     def on_mod_type_change(self, c):
         self.current_state["Mod_Params"]["Type"] = c
         self.save_data()
@@ -243,148 +159,306 @@ class ChocolateMultiFX_Pro(ctk.CTk):
     def update_amp_param(self, v, l, k, t):
         self.current_state["Amp_Params"][k] = int(v)
         if l: 
-            l.configure(text=f"{t}\n{int(v)}")
+            self.set_w(l, text=f"{t}\n{int(v)}")
         self.save_data()
         
-    def update_mod_param(self, v, l, k, n): val = round(float(v), 1) if k=="Rate" else int(v); self.current_state["Mod_Params"][k] = val; l.configure(text=f"{n}: {val}"); self.save_data()
-    def update_gate_val(self, v): self.current_state["Gate_Threshold"] = int(v); self.ng_lbl.configure(text=f"{int(v)} dB"); self.save_data()
-    def update_dly_param(self, v, lbl, k, n): self.current_state["Dly_Params"][k] = int(v); lbl.configure(text=f"{n}\n{int(v)}"); self.save_data()
-    def update_rev_param(self, v, lbl, k, n): self.current_state["Rev_Params"][k] = int(v); lbl.configure(text=f"{n}\n{int(v)}"); self.save_data()
-    def select_preset(self, p): self.is_idle = False; self.active_preset = p; self.current_state = self.all_data[str(self.current_bank)][self.active_preset]; self.refresh_ui()
+    def update_mod_param(self, v, l, k, n): val = round(float(v), 1) if k=="Rate" else int(v); self.current_state["Mod_Params"][k] = val; self.set_w(l, text=f"{n}: {val}"); self.save_data()
+    def update_gate_val(self, v): self.current_state["Gate_Threshold"] = int(v); self.set_w(self.ng_lbl, text=f"{int(v)} dB"); self.save_data()
+    def update_dly_param(self, v, lbl, k, n): self.current_state["Dly_Params"][k] = int(v); self.set_w(lbl, text=f"{n}\n{int(v)}"); self.save_data()
+    def update_rev_param(self, v, lbl, k, n): self.current_state["Rev_Params"][k] = int(v); self.set_w(lbl, text=f"{n}\n{int(v)}"); self.save_data()
+    def select_preset(self, p): self.is_idle = False; self.active_preset = p; self.current_state = self.engine.load_preset(self.current_bank, self.active_preset); self.refresh_ui()
     def toggle_preset_button(self, p):
         if p == self.active_preset and not self.is_idle: self.is_idle = True
-        else: self.is_idle = False; self.active_preset = p; self.current_state = self.all_data[str(self.current_bank)][self.active_preset]
+        else: self.is_idle = False; self.active_preset = p; self.current_state = self.engine.load_preset(self.current_bank, self.active_preset)
         self.refresh_ui()
 
-    def refresh_ui(self):
-        for widget in self.main_container.winfo_children(): 
-            widget.destroy()
-        if self.is_tuner_mode:
-            self.draw_tuner_screen()
-        else:
-            self.bank_dropdown.set(str(self.current_bank))
-            self.preset_dropdown.set(self.active_preset)
-            self.name_entry.delete(0, 'end')
-            self.name_entry.insert(0, self.current_state.get("Name", ""))
-            status = "IDLE (BYPASS)" if self.is_idle else f"{self.current_bank}{self.active_preset}: {self.current_state.get('Name','')}"
-            self.status_label.configure(text=f"NOW PRESET: {status}")
-            
-            if self.current_view == "Main":
-                if not self.is_live_mode: self.draw_preset_screen()
-                else: self.draw_live_navigator_screen()
-            else:
-                func = getattr(self, f"draw_{self.current_view.lower()}")
-                func()
-
     def setup_ui(self):
         self.top_bar = ctk.CTkFrame(self, fg_color="#3e362e", height=60); self.top_bar.pack(side="top", fill="x", padx=10, pady=5)
         ctk.CTkButton(self.top_bar, text="<", width=40, command=self.prev_bank).pack(side="left", padx=10)
         nav = ctk.CTkFrame(self.top_bar, fg_color="transparent"); nav.pack(side="left", expand=True)
-        self.bank_dropdown = ctk.CTkOptionMenu(nav, values=[str(i) for i in range(1, 10)], width=60, command=self.on_bank_change); self.bank_dropdown.pack(side="left", padx=2)
+        self.bank_dropdown = ctk.CTkOptionMenu(nav, values=list(self.all_data), width=60, command=self.on_bank_change); self.bank_dropdown.pack(side="left", padx=2)
         self.preset_dropdown = ctk.CTkOptionMenu(nav, values=["A", "B", "C", "D"], width=60, command=self.on_preset_change); self.preset_dropdown.pack(side="left", padx=2)
         self.name_entry = ctk.CTkEntry(nav, width=150); self.name_entry.pack(side="left", padx=10); self.name_entry.bind("<Return>", self.on_name_submit)
         self.tuner_btn = ctk.CTkButton(self.top_bar, text="TUNER: OFF", width=100, fg_color="#2d2620", border_width=1, command=self.toggle_tuner); self.tuner_btn.pack(side="right", padx=5)
         self.mode_btn = ctk.CTkButton(self.top_bar, text="MODE: PRESET", width=120, command=self.toggle_mode, fg_color="#5e503f"); self.mode_btn.pack(side="right", padx=10)
         ctk.CTkButton(self.top_bar, text=">", width=40, command=self.next_bank).pack(side="right", padx=10)
         self.status_bar = ctk.CTkFrame(self, fg_color="#d4a373", height=40); self.status_bar.pack(side="top", fill="x", padx=10, pady=(0, 5))
+        self.dsp_lbl = ctk.CTkLabel(self.status_bar, text="DSP LOAD --%", font=("Courier", 13, "bold"), text_color="#1e1b18"); self.dsp_lbl.pack(side="right", padx=10)
+        self.dsp_lbl.bind("<Button-1>", lambda e: self.dump_dsp_stats()); self.bind("<F12>", lambda e: self.dump_dsp_stats())
         self.status_label = ctk.CTkLabel(self.status_bar, text="", font=("Arial", 18, "bold"), text_color="#1e1b18"); self.status_label.pack(expand=True)
         bot = ctk.CTkFrame(self, fg_color="#14110f", height=50); bot.pack(side="bottom", fill="x", padx=10, pady=5)
         ctk.CTkLabel(bot, text="MASTER VOLUME", font=("Arial", 12, "bold"), text_color="#d4a373").pack(side="left", padx=20)
-        self.master_sld = ctk.CTkSlider(bot, from_=0, to=1, command=self.update_master_vol); self.master_sld.set(self.master_vol); self.master_sld.pack(side="left", expand=True, padx=20)
+        self.build_meters(bot)
+        self.master_sld = ctk.CTkSlider(bot, from_=0, to=1, command=self.update_master_vol); self.master_sld.set(self.engine.master_vol); self.master_sld.pack(side="left", expand=True, padx=20)
         self.main_container = ctk.CTkFrame(self, fg_color="transparent"); self.main_container.pack(expand=True, fill="both", padx=10, pady=5)
+        for key in VIEWS: self.build_view(key) # all up front: no widget gets created while playing
         self.refresh_ui()
+        self.update_dsp_load_loop()
+
+    # --- Views: every screen is built once and kept; a refresh only touches what changed ---
+    def view_key(self):
+        if self.is_tuner_mode: return "tuner"
+        if self.current_view == "Main": return "live" if self.is_live_mode else "preset"
+        return self.current_view.lower()
 
-    def draw_preset_screen(self):
+    def set_w(self, w, **kw):
+        # configure only the options whose value differs from what the widget already shows
+        last = self._shown.setdefault(w, {})
+        diff = {k: v for k, v in kw.items() if last.get(k) != v}
+        if diff: w.configure(**diff); last.update(diff)
+
+    def set_val(self, w, v):
+        # sliders / option menus: set() doesn't fire their command, so nothing gets saved back
+        if w.get() != v: w.set(v)
+
+    def refresh_ui(self):
+        t0 = perf_counter()
+        if not self.is_tuner_mode:
+            self.set_val(self.bank_dropdown, self.current_bank)
+            self.set_val(self.preset_dropdown, self.active_preset)
+            name = self.current_state.get("Name", "")
+            if self.name_entry.get() != name: self.name_entry.delete(0, 'end'); self.name_entry.insert(0, name)
+            status = "IDLE (BYPASS)" if self.is_idle else f"{self.current_bank}{self.active_preset}: {name}"
+            self.set_w(self.status_label, text=f"NOW PRESET: {status}")
+        key = self.view_key()
+        if key not in self.views: self.build_view(key)
+        getattr(self, f"update_{key}")()
+        if key != self.shown_view:
+            if self.shown_view is not None: self.views[self.shown_view].pack_forget()
+            self.views[key].pack(expand=True, fill="both")
+        # the first show includes the initial layout pass, so it isn't counted
+        if self.shown_view is not None: self.after_idle(self.ui_drawn, t0)
+        self.shown_view = key
+        if self.footswitch: self.show_on_footswitch()
+
+    def ui_drawn(self, t0):
+        # idle callbacks run in order, so Tk's own redraws queued by the refresh are done by now
+        self.ui_last_ms = (perf_counter() - t0) * 1000
+        self.ui_worst_ms = max(self.ui_worst_ms, self.ui_last_ms)
+
+    def build_view(self, key):
+        f = self.views[key] = ctk.CTkFrame(self.main_container, fg_color="transparent")
+        getattr(self, f"build_{key}")(f)
+
+    def back_header(self, v, pady=5):
+        h = ctk.CTkFrame(v, fg_color="transparent"); h.pack(fill="x", pady=pady)
+        ctk.CTkButton(h, text="← BACK", width=80, command=self.go_back).pack(side="left")
+        return h
+
+    def build_preset(self, v):
+        self.preset_btns, self.preset_dots = {}, {}
         for p in ["A", "B", "C", "D"]:
-            p_data = self.all_data[str(self.current_bank)][p]
-            f = ctk.CTkFrame(self.main_container, fg_color="transparent"); f.pack(side="left", expand=True, fill="both", padx=5)
-            btn = ctk.CTkButton(f, text=f"{self.current_bank}{p}\n{p_data.get('Name','')}", height=220, font=("Arial", 25, "bold"), command=lambda x=p: self.toggle_preset_button(x), fg_color="#d4a373" if (p == self.active_preset and not self.is_idle) else "#3e362e")
+            f = ctk.CTkFrame(v, fg_color="transparent"); f.pack(side="left", expand=True, fill="both", padx=5)
+            btn = self.preset_btns[p] = ctk.CTkButton(f, text="", height=220, font=("Arial", 25, "bold"), command=lambda x=p: self.toggle_preset_button(x))
             btn.pack(expand=True, fill="both"); ic = ctk.CTkFrame(f, fg_color="#14110f", height=30); ic.pack(fill="x", pady=(2, 0))
-            for fx in ["Gate", "Amp", "Mod", "Dly", "Rev"]: ctk.CTkLabel(ic, text="●", text_color=self.fx_colors[fx] if p_data.get(fx) else "#2d2620", font=("Arial", 16), width=18).pack(side="left", expand=True)
-
-    def draw_live_navigator_screen(self):
-        t = ctk.CTkFrame(self.main_container, fg_color="transparent"); t.pack(side="top", expand=True, fill="both", pady=5)
-        b = ctk.CTkFrame(self.main_container, fg_color="transparent"); b.pack(side="top", expand=True, fill="both", pady=5)
-        for key in ["Gate", "Amp", "Mod", "Dly", "Rev"]:
+            self.preset_dots[p] = [ctk.CTkLabel(ic, text="●", font=("Arial", 16), width=18) for _ in DEFAULT_CHAIN]
+            for d in self.preset_dots[p]: d.pack(side="left", expand=True)
+
+    def update_preset(self):
+        bank = self.all_data[self.current_bank]
+        for p, btn in self.preset_btns.items():
+            p_data = bank[p]
+            self.set_w(btn, text=f"{self.current_bank}{p}\n{p_data.get('Name','')}", fg_color="#d4a373" if (p == self.active_preset and not self.is_idle) else "#3e362e")
+            for d, fx in zip(self.preset_dots[p], self.chain(p_data)): self.set_w(d, text_color=self.fx_colors[fx] if p_data.get(fx) else "#2d2620")
+
+    def build_live(self, v):
+        # columns are slots in the signal order, not effects: a reorder just relabels them
+        t = ctk.CTkFrame(v, fg_color="transparent"); t.pack(side="top", expand=True, fill="both", pady=5)
+        b = ctk.CTkFrame(v, fg_color="transparent"); b.pack(side="top", expand=True, fill="both", pady=5)
+        o = ctk.CTkFrame(v, fg_color="transparent"); o.pack(side="top", fill="x", pady=(0, 5)) # signal order, left to right
+        self.live_cols = []
+        for i in range(len(DEFAULT_CHAIN)):
+            tb = ctk.CTkButton(t, text="", command=lambda i=i: self.toggle_fx(self.chain()[i])); tb.pack(side="left", expand=True, padx=3, fill="both")
+            sb = ctk.CTkButton(b, text="", fg_color="#2d2620", border_width=1, command=lambda i=i: self.go_to_setup(self.chain()[i])); sb.pack(side="left", expand=True, padx=3, fill="both")
+            mv = ctk.CTkFrame(o, fg_color="transparent"); mv.pack(side="left", expand=True)
+            ctk.CTkButton(mv, text="◀", width=40, fg_color="#2d2620", command=lambda i=i: self.move_fx(self.chain()[i], -1)).pack(side="left", padx=2)
+            ctk.CTkButton(mv, text="▶", width=40, fg_color="#2d2620", command=lambda i=i: self.move_fx(self.chain()[i], 1)).pack(side="left", padx=2)
+            self.live_cols.append((tb, sb))
+
+    def update_live(self):
+        for (tb, sb), key in zip(self.live_cols, self.chain()):
             is_on = self.current_state.get(key, False)
-            ctk.CTkButton(t, text=f"{key.upper()}\n{'ON' if is_on else 'OFF'}", fg_color=self.fx_colors[key] if is_on else "#3e362e", command=lambda k=key: self.toggle_fx(k)).pack(side="left", expand=True, padx=3, fill="both")
-            ctk.CTkButton(b, text=f"SET {key.upper()}", fg_color="#2d2620", border_width=1, border_color=self.fx_colors[key], command=lambda k=key: self.go_to_setup(k)).pack(side="left", expand=True, padx=3, fill="both")
-
-    def draw_setup_gate(self):
-        h = ctk.CTkFrame(self.main_container, fg_color="transparent"); h.pack(fill="x", pady=10); ctk.CTkButton(h, text="← BACK", width=80, command=self.go_back).pack(side="left")
-        v = self.current_state.get("Gate_Threshold", -45); body = ctk.CTkFrame(self.main_container, fg_color="#2d2620", corner_radius=15); body.pack(expand=True, fill="both", padx=20, pady=20)
-        self.ng_lbl = ctk.CTkLabel(body, text=f"{int(v)} dB", font=("Arial", 40, "bold")); self.ng_lbl.pack(pady=20)
-        s = ctk.CTkSlider(body, from_=-60, to=-5, width=400, command=self.update_gate_val); s.set(v); s.pack(pady=10)
-    
-    def draw_setup_amp(self):
-        h = ctk.CTkFrame(self.main_container, fg_color="transparent"); h.pack(fill="x", pady=5)
-        ctk.CTkButton(h, text="← BACK", command=self.go_back).pack(side="left")
-        modes = ["Clean", "Overdrive 1", "Overdrive 2", "Distortion", "Fuzz"]
-        self.drive_dropdown = ctk.CTkOptionMenu(h, values=modes, command=self.on_drive_mode_change)
-        self.drive_dropdown.set(self.current_state["Amp_Params"]["Drive_Mode"]); self.drive_dropdown.pack(side="left", padx=20)
-        
-        f = ctk.CTkFrame(self.main_container, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5)
-        if self.current_state["Amp_Params"]["Drive_Mode"] == "Clean":
-            wf = ctk.CTkFrame(f, fg_color="transparent"); wf.pack(fill="x", padx=20, pady=10)
-            ctk.CTkLabel(wf, text="Warmth").pack(side="left")
-            ws = ctk.CTkSlider(wf, from_=0, to=100, command=lambda v: self.update_amp_param(v, None, "Warmth", "Warmth"))
-            ws.set(self.current_state["Amp_Params"].get("Warmth", 0)); ws.pack(side="left", expand=True, padx=10)
-
-        row = ctk.CTkFrame(f, fg_color="transparent"); row.pack(expand=True, fill="both")
+            self.set_w(tb, text=f"{key.upper()}\n{'ON' if is_on else 'OFF'}", fg_color=self.fx_colors[key] if is_on else "#3e362e")
+            self.set_w(sb, text=f"SET {key.upper()}", border_color=self.fx_colors[key])
+
+    def build_setup_gate(self, v):
+        self.back_header(v, pady=10)
+        body = ctk.CTkFrame(v, fg_color="#2d2620", corner_radius=15); body.pack(expand=True, fill="both", padx=20, pady=20)
+        self.ng_lbl = ctk.CTkLabel(body, text="", font=("Arial", 40, "bold")); self.ng_lbl.pack(pady=20)
+        self.gate_sld = ctk.CTkSlider(body, from_=-60, to=-5, width=400, command=self.update_gate_val); self.gate_sld.pack(pady=10)
+
+    def update_setup_gate(self):
+        v = self.current_state.get("Gate_Threshold", -45)
+        self.set_w(self.ng_lbl, text=f"{int(v)} dB"); self.set_val(self.gate_sld, v)
+
+    def build_setup_amp(self, v):
+        h = self.back_header(v)
+        self.drive_dropdown = ctk.CTkOptionMenu(h, values=DRIVE_MODES, command=self.on_drive_mode_change); self.drive_dropdown.pack(side="left", padx=20)
+        # oversampling trades CPU for less aliasing from the high-gain modes
+        self.os_dropdown = ctk.CTkOptionMenu(h, values=["1x", "2x", "4x"], width=70, command=self.on_oversample_change); self.os_dropdown.pack(side="left")
+        ctk.CTkLabel(h, text="CAB").pack(side="left", padx=(20, 5)) # IRs in irs/cab
+        self.cab_dropdown = ctk.CTkOptionMenu(h, values=["Off"] + list_irs("cab"), width=120, command=self.on_cab_change); self.cab_dropdown.pack(side="left")
+
+        f = ctk.CTkFrame(v, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5)
+        self.warmth_row = ctk.CTkFrame(f, fg_color="transparent") # Clean only: packed / forgotten by update_setup_amp
+        ctk.CTkLabel(self.warmth_row, text="Warmth").pack(side="left")
+        self.warmth_sld = ctk.CTkSlider(self.warmth_row, from_=0, to=100, command=lambda v: self.update_amp_param(v, None, "Warmth", "Warmth")); self.warmth_sld.pack(side="left", expand=True, padx=10)
+
+        self.amp_row = ctk.CTkFrame(f, fg_color="transparent"); self.amp_row.pack(expand=True, fill="both")
+        self.amp_ctl = {}
         for lbl, k in [("VOL", "Vol"), ("GAIN", "Gain"), ("BASS", "Bas"), ("MID", "Mid"), ("TRE", "Tre")]:
-            fr = ctk.CTkFrame(row, fg_color="transparent"); fr.pack(side="left", expand=True)
-            l = ctk.CTkLabel(fr, text=f"{lbl}\n{self.current_state['Amp_Params'][k]}"); l.pack()
-            s = ctk.CTkSlider(fr, from_=0, to=100, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_amp_param(v, obj, key, t))
-            s.set(self.current_state['Amp_Params'][k]); s.pack(pady=5)
+            fr = ctk.CTkFrame(self.amp_row, fg_color="transparent"); fr.pack(side="left", expand=True)
+            l = ctk.CTkLabel(fr, text=""); l.pack()
+            s = ctk.CTkSlider(fr, from_=0, to=100, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_amp_param(v, obj, key, t)); s.pack(pady=5)
+            self.amp_ctl[k] = (lbl, l, s)
 
         nf = ctk.CTkFrame(f, fg_color="#14110f"); nf.pack(fill="x", padx=10, pady=10)
         ctk.CTkLabel(nf, text="PRESET NOTES:", font=("Arial", 11, "bold")).pack(anchor="w", padx=10)
-        self.notes_text = ctk.CTkTextbox(nf, height=70, font=("Courier", 12))
-        self.notes_text.pack(fill="x", padx=10, pady=5); self.notes_text.insert("0.0", self.current_state.get("Notes", ""))
+        self.notes_text = ctk.CTkTextbox(nf, height=70, font=("Courier", 12)); self.notes_text.pack(fill="x", padx=10, pady=5)
         self.notes_text.bind("<KeyRelease>", lambda e: self.save_notes())
-        
-    def draw_setup_mod(self):
-        h = ctk.CTkFrame(self.main_container, fg_color="transparent"); h.pack(fill="x", pady=5); ctk.CTkButton(h, text="← BACK", width=80, command=self.go_back).pack(side="left")
-        self.mod_dropdown = ctk.CTkOptionMenu(h, values=["Chorus", "Tremolo", "Flanger"], command=self.on_mod_type_change)
-        self.mod_dropdown.pack(side="left", padx=20); self.mod_dropdown.set(self.current_state["Mod_Params"]["Type"])
-        f = ctk.CTkFrame(self.main_container, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); m = self.current_state["Mod_Params"]; r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(fill="x", pady=20)
-        for lbl, k, st, en in [("RATE (Hz)", "Rate", 0.1, 10.0), ("DEPTH (%)", "Depth", 0, 100)]:
-            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True, fill="x", padx=10); l = ctk.CTkLabel(fr, text=f"{lbl}: {m[k]}"); l.pack()
-            s = ctk.CTkSlider(fr, from_=st, to=en, command=lambda v, obj=l, key=k, n=lbl: self.update_mod_param(v, obj, key, n)); s.set(m[k]); s.pack(fill="x")
 
-    def draw_setup_dly(self):
-        h = ctk.CTkFrame(self.main_container, fg_color="transparent"); h.pack(fill="x", pady=5); ctk.CTkButton(h, text="← BACK", width=80, command=self.go_back).pack(side="left")
-        d = self.current_state["Dly_Params"]; f = ctk.CTkFrame(self.main_container, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(expand=True, fill="both", pady=20)
+    def update_setup_amp(self):
+        a = self.current_state["Amp_Params"]
+        self.set_val(self.drive_dropdown, a["Drive_Mode"]); self.set_val(self.os_dropdown, f"{a.get('Oversample', 1)}x")
+        self.set_val(self.cab_dropdown, a.get("Cab") or "Off")
+        clean = a["Drive_Mode"] == "Clean"
+        if clean != bool(self.warmth_row.winfo_manager()):
+            if clean: self.warmth_row.pack(fill="x", padx=20, pady=10, before=self.amp_row)
+            else: self.warmth_row.pack_forget()
+        self.set_val(self.warmth_sld, a.get("Warmth", 0))
+        for k, (lbl, l, s) in self.amp_ctl.items(): self.set_w(l, text=f"{lbl}\n{a[k]}"); self.set_val(s, a[k])
+        notes = self.current_state.get("Notes", "")
+        if self.notes_text.get("0.0", "end-1c") != notes: self.notes_text.delete("0.0", "end"); self.notes_text.insert("0.0", notes)
+
+    def build_setup_mod(self, v):
+        h = self.back_header(v)
+        self.mod_dropdown = ctk.CTkOptionMenu(h, values=["Chorus", "Tremolo", "Flanger"], command=self.on_mod_type_change); self.mod_dropdown.pack(side="left", padx=20)
+        f = ctk.CTkFrame(v, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(fill="x", pady=20)
+        self.mod_ctl = {}
+        for lbl, k, st, en in [("RATE (Hz)", "Rate", 0.1, 10.0), ("DEPTH (%)", "Depth", 0, 100)]:
+            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True, fill="x", padx=10); l = ctk.CTkLabel(fr, text=""); l.pack()
+            s = ctk.CTkSlider(fr, from_=st, to=en, command=lambda v, obj=l, key=k, n=lbl: self.update_mod_param(v, obj, key, n)); s.pack(fill="x")
+            self.mod_ctl[k] = (lbl, l, s)
+
+    def update_setup_mod(self):
+        m = self.current_state["Mod_Params"]; self.set_val(self.mod_dropdown, m["Type"])
+        for k, (lbl, l, s) in self.mod_ctl.items(): self.set_w(l, text=f"{lbl}: {m[k]}"); self.set_val(s, m[k])
+
+    def build_setup_dly(self, v):
+        self.back_header(v)
+        f = ctk.CTkFrame(v, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(expand=True, fill="both", pady=20)
+        self.dly_ctl = {}
         for lbl, k, st, en in [("TIME (ms)", "Time", 50, 1000), ("FEEDBACK", "Feedback", 0, 90), ("MIX", "Mix", 0, 100)]:
-            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True); l = ctk.CTkLabel(fr, text=f"{lbl}\n{d[k]}"); l.pack()
-            s = ctk.CTkSlider(fr, from_=st, to=en, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_dly_param(v, obj, key, t)); s.set(d[k]); s.pack(pady=5)
-
-    def draw_setup_rev(self):
-        h = ctk.CTkFrame(self.main_container, fg_color="transparent"); h.pack(fill="x", pady=5); ctk.CTkButton(h, text="← BACK", width=80, command=self.go_back).pack(side="left")
-        rv = self.current_state["Rev_Params"]; f = ctk.CTkFrame(self.main_container, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(expand=True, fill="both", pady=20)
-        for lbl, k, st, en in [("ROOM SIZE", "Size", 10, 95), ("MIX", "Mix", 0, 100)]:
-            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True); l = ctk.CTkLabel(fr, text=f"{lbl}\n{rv[k]}"); l.pack()
-            s = ctk.CTkSlider(fr, from_=st, to=en, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_rev_param(v, obj, key, t)); s.set(rv[k]); s.pack(pady=5)
-
-    def draw_tuner_screen(self):
-        f = ctk.CTkFrame(self.main_container, fg_color="#000000", corner_radius=15); f.pack(expand=True, fill="both", padx=20, pady=20)
+            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True); l = ctk.CTkLabel(fr, text=""); l.pack()
+            s = ctk.CTkSlider(fr, from_=st, to=en, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_dly_param(v, obj, key, t)); s.pack(pady=5)
+            self.dly_ctl[k] = (lbl, l, s)
+
+    def update_setup_dly(self):
+        d = self.current_state["Dly_Params"]
+        for k, (lbl, l, s) in self.dly_ctl.items(): self.set_w(l, text=f"{lbl}\n{d[k]}"); self.set_val(s, d[k])
+
+    def build_setup_rev(self, v):
+        h = self.back_header(v)
+        ctk.CTkLabel(h, text="ROOM").pack(side="left", padx=(20, 5)) # IRs in irs/room; Algorithmic = the built-in reverb
+        self.room_dropdown = ctk.CTkOptionMenu(h, values=["Algorithmic"] + list_irs("room"), width=140, command=self.on_room_change); self.room_dropdown.pack(side="left")
+        f = ctk.CTkFrame(v, fg_color="#2d2620", corner_radius=15); f.pack(expand=True, fill="both", padx=5, pady=5); r = ctk.CTkFrame(f, fg_color="transparent"); r.pack(expand=True, fill="both", pady=20)
+        self.rev_ctl = {}
+        for lbl, k, st, en in [("ROOM SIZE", "Size", 10, 95), ("DAMP", "Damp", 0, 100), ("MIX", "Mix", 0, 100)]:
+            fr = ctk.CTkFrame(r, fg_color="transparent"); fr.pack(side="left", expand=True); l = ctk.CTkLabel(fr, text=""); l.pack()
+            s = ctk.CTkSlider(fr, from_=st, to=en, orientation="vertical", height=120, command=lambda v, obj=l, key=k, t=lbl: self.update_rev_param(v, obj, key, t)); s.pack(pady=5)
+            self.rev_ctl[k] = (lbl, l, s)
+
+    def update_setup_rev(self):
+        rv = self.current_state["Rev_Params"]
+        self.set_val(self.room_dropdown, rv.get("IR") or "Algorithmic")
+        for k, (lbl, l, s) in self.rev_ctl.items(): self.set_w(l, text=f"{lbl}\n{rv[k]}"); self.set_val(s, rv[k])
+
+    def build_tuner(self, v):
+        f = ctk.CTkFrame(v, fg_color="#000000", corner_radius=15); f.pack(expand=True, fill="both", padx=20, pady=20)
         ctk.CTkLabel(f, text="CHROMATIC TUNER", font=("Arial", 24, "bold"), text_color="#ff9500").pack(pady=20)
         self.note_lbl = ctk.CTkLabel(f, text="-", font=("Arial", 120, "bold"), text_color="white"); self.note_lbl.pack(pady=10)
+        self.cents_lbl = ctk.CTkLabel(f, text="", font=("Arial", 20), text_color="white"); self.cents_lbl.pack()
         self.t_gauge = ctk.CTkProgressBar(f, width=500, height=20); self.t_gauge.pack(pady=30); ctk.CTkLabel(f, text="MUTE MODE ACTIVE", text_color="#ff4d4d").pack()
-        self.update_tuner_ui_loop()
+
+    def update_tuner(self): pass # driven by update_tuner_ui_loop while the tuner is on
 
     def update_tuner_ui_loop(self):
+        self.tuner_job = None
         if not self.is_tuner_mode: return
-        self.note_lbl.configure(text=self.current_note)
-        val = 0.5 + (np.clip(self.tuning_diff, -10, 10) / 40)
-        self.t_gauge.set(val); self.t_gauge.configure(progress_color="#4dff4d" if abs(self.tuning_diff) < 1.5 else "#ff4d4d")
-        self.after(100, self.update_tuner_ui_loop)
+        note, cents = self.tuner.note, self.tuner.cents
+        self.set_w(self.note_lbl, text=note)
+        self.set_w(self.cents_lbl, text=f"{cents:+.0f} cents  ({self.tuner.freq:.1f} Hz)" if note != "-" else "")
+        val = 0.5 + (np.clip(cents, -50, 50) / 100)
+        self.t_gauge.set(val); self.set_w(self.t_gauge, progress_color="#4dff4d" if abs(cents) < 5 else "#ff4d4d")
+        self.tuner_job = self.after(100, self.update_tuner_ui_loop)
+
+    # --- Meters: in / out peak with hold, gate, output spectrum; plain Canvas items moved in place ---
+    def build_meters(self, parent):
+        tap = getattr(self.engine, "meter_tap", None) or MeterTap() # the DSP process's shared one, or our own
+        self.meters = MeterReader(tap, FS, bands=SPECTRUM_BANDS)
+        self.audio.meter = tap
+        cv = self.meter_cv = tk.Canvas(parent, width=METER_W + 5 * SPECTRUM_BANDS + 8, height=36, bg="#14110f", highlightthickness=0); cv.pack(side="right", padx=10)
+        for i, t in enumerate(("IN", "OUT", "GATE")): cv.create_text(2, 6 + 12 * i, text=t, anchor="w", fill="#d4a373", font=("Arial", 7, "bold"))
+        self.meter_bars = [cv.create_rectangle(30, 2 + 12 * i, 30, 10 + 12 * i, fill="#4dff4d" if i < 2 else "#ff9500", width=0) for i in range(3)]
+        self.meter_holds = [cv.create_line(30, 2 + 12 * i, 30, 10 + 12 * i, fill="white") for i in range(2)]
+        x0 = METER_W + 8
+        self.spec_bars = [cv.create_rectangle(x0 + 5 * i, 36, x0 + 5 * i + 4, 36, fill="#b34dff", width=0) for i in range(SPECTRUM_BANDS)]
+        self._drawn = {} # canvas item -> coords / fill it has, so unchanged items aren't touched
+        self._meter_t = perf_counter()
+        self.update_meters_loop()
+
+    def set_item(self, item, xy, fill=None):
+        if self._drawn.get(item) != xy: self.meter_cv.coords(item, *xy); self._drawn[item] = xy
+        if fill is not None and self._drawn.get((item, "fill")) != fill: self.meter_cv.itemconfigure(item, fill=fill); self._drawn[item, "fill"] = fill
+
+    def update_meters_loop(self):
+        now = perf_counter(); m = self.meters.update(now - self._meter_t); self._meter_t = now
+        px = lambda db: 30 + int((METER_W - 30) * min(max((db + 60) / 60, 0.0), 1.0)) # -60 .. 0 dBFS
+        for i in range(2):
+            y = 2 + 12 * i
+            self.set_item(self.meter_bars[i], (30, y, px(m.peak_db[i]), y + 8), "#ff4d4d" if m.hold_db[i] > -1 else "#4dff4d")
+            self.set_item(self.meter_holds[i], (px(m.hold_db[i]), y, px(m.hold_db[i]), y + 8))
+        self.set_item(self.meter_bars[2], (30, 26, px(m.gate_db), 34))
+        x0 = METER_W + 8
+        for i, db in enumerate(m.spectrum_db):
+            self.set_item(self.spec_bars[i], (x0 + 5 * i, 36 - int(34 * min(max((db + 80) / 80, 0.0), 1.0)), x0 + 5 * i + 4, 36))
+        self.after(1000 // METER_FPS, self.update_meters_loop)
+
+    # --- DSP load / xrun indicator (tap it, or press F12, to dump the full stats) ---
+    def update_dsp_load_loop(self):
+        st = self.audio.stats
+        bad = st.xruns > self.last_xruns or st.load > 0.8 or st.exceptions > self.last_exceptions
+        self.last_xruns, self.last_exceptions = st.xruns, st.exceptions
+        self.set_w(self.dsp_lbl, text=f"DSP LOAD {st.load:4.0%} | XRUN {st.xruns} | RT {st.latency_ms:4.1f}ms | UI {self.ui_last_ms:3.0f}ms", text_color="#b00000" if bad else "#1e1b18")
+        self.after(500, self.update_dsp_load_loop)
+
+    def dump_dsp_stats(self):
+        self.audio.stats.dump(self.stats_file)
+        print(f"DSP stats written to {self.stats_file}")
+        print(f"UI refresh: last {self.ui_last_ms:.1f} ms, worst {self.ui_worst_ms:.1f} ms")
+        if self.footswitch: print(self.footswitch.summary())
+
+    # --- TM1638 footswitch board: same actions as the touchscreen, polled from Tk's loop ---
+    def start_footswitch(self):
+        if not FOOTSWITCH: return
+        try: board = TM1638(*TM1638_PINS)
+        except (ImportError, RuntimeError) as e: print(f"Footswitch Error: {e}"); return
+        self.footswitch = Footswitch(board, {"preset": self.toggle_preset_button, "prev_bank": self.prev_bank, "next_bank": self.next_bank,
+                                             "tuner": self.toggle_tuner, "fx": self.toggle_fx}, self.audio.stats)
+        self.show_on_footswitch()
+        board.start_scan()
+        self.poll_footswitch()
+
+    def poll_footswitch(self):
+        self.footswitch.poll()
+        self.after(FOOTSWITCH_POLL_MS, self.poll_footswitch)
+
+    def show_on_footswitch(self):
+        text = "tunEr" if self.is_tuner_mode else f"{self.current_bank}{self.active_preset} --" if self.is_idle else f"{self.current_bank}{self.active_preset} {self.current_state.get('Name', '')}"
+        self.footswitch.show(text, [k for k in DEFAULT_CHAIN if self.current_state.get(k)], self.is_tuner_mode)
 
     def start_audio_stream(self):
-        try:
-            self.stream = sd.Stream(device=2, channels=(1, 2), callback=self.audio_callback, samplerate=FS, blocksize=BLOCK_SIZE)
-            self.stream.start()
-        except Exception as e: print(f"Audio Error: {e}")
+        self.audio.start()
 
 if __name__ == "__main__":
     app = ChocolateMultiFX_Pro()
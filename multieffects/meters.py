@@ -0,0 +1,88 @@
+import numpy as np
+from ringbuffer import SampleRing
+
+# --- Level meters and spectrum: cheap records from the callback, the maths on the UI side ---
+#
+# MeterTap.write() is all the audio thread does: peak and mean square of the input and the
+# output block plus the gate's gain, as one row into a ring, and the output samples into
+# another. No FFT, no log, no allocation. MeterReader turns them into dB with meter
+# ballistics and a log-spaced spectrum, at whatever rate the display asks for.
+
+IN_PEAK, IN_MS, OUT_PEAK, OUT_MS, GATE = range(5) # columns of a level record
+LEVEL_RECORDS = 256 # ~6 s of 1024-sample blocks; the reader only needs what arrived since its last frame
+SPECTRUM_RING = 1 << 13
+FLOOR_DB = -90.0
+
+class MeterTap:
+    def __init__(self, memory=None):
+        # memory: optional buffer of nbytes() bytes (e.g. shared memory for the DSP process)
+        n_lv = SampleRing.nbytes(LEVEL_RECORDS, np.float32, 5)
+        memory = memoryview(memory if memory is not None else bytearray(self.nbytes())) # slices must stay views
+        self.levels = SampleRing(LEVEL_RECORDS, np.float32, memory[:n_lv], width=5)
+        self.samples = SampleRing(SPECTRUM_RING, np.float32, memory[n_lv:n_lv + SampleRing.nbytes(SPECTRUM_RING)])
+        self._row = np.zeros((1, 5), np.float32)
+
+    @staticmethod
+    def nbytes():
+        return SampleRing.nbytes(LEVEL_RECORDS, np.float32, 5) + SampleRing.nbytes(SPECTRUM_RING)
+
+    # --- audio thread ---
+    def write(self, x, y, gate=1.0):
+        # x: input block, y: output block (mono views into the stream buffers)
+        row = self._row[0]
+        row[IN_PEAK] = max(x.max(), -x.min()); row[IN_MS] = np.dot(x, x) / len(x)
+        row[OUT_PEAK] = max(y.max(), -y.min()); row[OUT_MS] = np.dot(y, y) / len(y)
+        row[GATE] = gate
+        self.levels.write(self._row)
+        self.samples.write(y)
+
+
+def to_db(x, floor=FLOOR_DB):
+    return np.maximum(10 * np.log10(np.maximum(x, 1e-12)), floor)
+
+
+class MeterReader:
+    """UI side of a MeterTap: call update() once per display frame."""
+
+    def __init__(self, tap, fs, fft_size=2048, bands=32, fmin=40.0, decay_db_s=24.0, hold_s=1.0):
+        self.tap = tap
+        self.fs = fs
+        self.decay_db_s = decay_db_s
+        self.hold_s = hold_s
+        self.peak_db = np.full(2, FLOOR_DB) # in, out: fast attack, decaying
+        self.rms_db = np.full(2, FLOOR_DB)
+        self.hold_db = np.full(2, FLOOR_DB) # in, out: highest peak over the last hold_s
+        self.gate_db = 0.0 # 0 = gate open, FLOOR_DB = shut
+        self.spectrum_db = np.full(bands, FLOOR_DB)
+        self._held = np.zeros(2)
+        self._rows = np.empty((LEVEL_RECORDS, 5), np.float32)
+        self._frame = np.empty(fft_size, np.float32)
+        self._window = np.hanning(fft_size).astype(np.float32)
+        self._norm = (self._window.sum() / 2) ** 2 # a full-scale sine reads 0 dB
+        # log-spaced bands: each is the loudest rfft bin between its edges
+        edges = np.geomspace(fmin, fs / 2, bands + 1) * fft_size / fs
+        self._starts = np.minimum(np.maximum(np.round(edges[:-1]).astype(int), 1), fft_size // 2 - 1)
+        self._starts = np.maximum.accumulate(self._starts)
+        self.band_hz = edges[:-1] * fs / fft_size
+
+    def update(self, dt):
+        # dt: seconds since the last update
+        n = self.tap.levels.read(self._rows)
+        fall = self.decay_db_s * dt
+        self._held += dt
+        if n:
+            rows = self._rows[:n]
+            peak = to_db(np.square(rows[:, [IN_PEAK, OUT_PEAK]].max(axis=0)))
+            self.rms_db = to_db(rows[-1, [IN_MS, OUT_MS]])
+            self.gate_db = float(to_db(np.square(rows[-1, GATE])))
+            up = peak >= self.hold_db
+            self.hold_db[up] = peak[up]; self._held[up] = 0
+        else: peak = np.full(2, FLOOR_DB)
+        self.peak_db = np.maximum(peak, self.peak_db - fall)
+        old = self._held > self.hold_s
+        self.hold_db[old] = np.maximum(self.hold_db[old] - fall, self.peak_db[old])
+        if self.tap.samples.latest(self._frame):
+            spec = np.abs(np.fft.rfft(self._frame * self._window)) ** 2 / self._norm
+            bands = to_db(np.maximum.reduceat(spec, self._starts))
+            self.spectrum_db = np.maximum(bands, self.spectrum_db - fall)
+        return self
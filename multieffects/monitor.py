@@ -0,0 +1,126 @@
+import json
+from bisect import bisect
+from time import perf_counter_ns
+import numpy as np
+
+# --- Live callback instrumentation ---
+#
+# Everything the audio thread touches is allocated up front: counters, a fixed-bin timing
+# histogram per stage and per-preset load records. The callback only adds to them;
+# snapshot()/dump() do the (allocating) summarising on whichever thread asks.
+
+STAGES = ("callback", "Amp", "Gate", "Mod", "Dly", "Rev", "Spill") # as engine.STAGE_NAMES
+EDGES_US = (10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000)
+EDGES_NS = tuple(e * 1000 for e in EDGES_US)
+
+class CallbackStats:
+    def __init__(self, fs, block_size, stages=STAGES):
+        self.stages = stages
+        self.deadline_ns = block_size / fs * 1e9
+        self.hist = np.zeros((len(stages), len(EDGES_NS) + 1), dtype=np.int64)
+        self.worst_ns = [0] * len(stages)
+        self.total_ns = [0] * len(stages)
+        self.by_preset = {} # "1A" -> [blocks, total_ns, worst_ns, deadline_misses]
+        self._preset = None
+        self.nominal_ms = 0.0 # input + output latency the stream reported when it opened; kept over reset() (for backends without timestamps)
+        self.reset()
+
+    def reset(self):
+        self.hist.fill(0)
+        for i in range(len(self.stages)): self.worst_ns[i] = self.total_ns[i] = 0
+        for rec in self.by_preset.values(): rec[:] = [0, 0, 0, 0]
+        self.blocks = 0
+        self.deadline_misses = 0
+        self.input_underflow = self.input_overflow = 0
+        self.output_underflow = self.output_overflow = 0
+        self.exceptions = 0
+        self.last_exception = ""
+        self.load = 0.0 # smoothed callback time / block duration
+        self.peak_load = 0.0
+        self.switches = 0 # preset switches, timed from the UI publishing the preset to the callback picking it up
+        self.switch_total_ns = self.switch_worst_ns = self.switch_last_ns = 0
+        self.switch_at_ns = 0 # perf_counter_ns of the last pickup (CLOCK_MONOTONIC: comparable across processes)
+        self.round_trip_ms = 0.0 # input ADC -> output DAC of the last block, from the stream's own timestamps
+
+    def set_preset(self, label):
+        # UI thread: make sure the record exists before the callback starts writing to it
+        self._preset = self.by_preset.setdefault(label, [0, 0, 0, 0])
+
+    # --- called from the audio thread ---
+    def record_status(self, status):
+        if status.input_underflow: self.input_underflow += 1
+        if status.input_overflow: self.input_overflow += 1
+        if status.output_underflow: self.output_underflow += 1
+        if status.output_overflow: self.output_overflow += 1
+
+    def record_exception(self, e):
+        self.exceptions += 1
+        self.last_exception = repr(e)
+
+    def record_switch(self, dt, at):
+        self.switches += 1; self.switch_total_ns += dt; self.switch_last_ns = dt; self.switch_at_ns = at
+        if dt > self.switch_worst_ns: self.switch_worst_ns = dt
+
+    def record_latency(self, adc, dac):
+        # the callback's time info, in the stream's clock; 0 when the backend doesn't provide it
+        if adc and dac > adc: self.round_trip_ms = (dac - adc) * 1000
+
+    def mark(self, stage, t0):
+        # time since t0 goes to `stage` (index into self.stages); returns now so marks can be chained
+        now = perf_counter_ns(); dt = now - t0
+        self.hist[stage, bisect(EDGES_NS, dt)] += 1
+        self.total_ns[stage] += dt
+        if dt > self.worst_ns[stage]: self.worst_ns[stage] = dt
+        return now
+
+    def end_block(self, t0):
+        dt = self.mark(0, t0) - t0
+        self.blocks += 1
+        load = dt / self.deadline_ns
+        self.load += (load - self.load) * 0.05
+        if load > self.peak_load: self.peak_load = load
+        miss = dt > self.deadline_ns
+        if miss: self.deadline_misses += 1
+        rec = self._preset
+        if rec is not None:
+            rec[0] += 1; rec[1] += dt
+            if dt > rec[2]: rec[2] = dt
+            if miss: rec[3] += 1
+
+    # --- reporting (any thread) ---
+    @property
+    def latency_ms(self):
+        return self.round_trip_ms or self.nominal_ms
+
+    @property
+    def xruns(self):
+        return self.input_underflow + self.input_overflow + self.output_underflow + self.output_overflow
+
+    def snapshot(self):
+        stages = {}
+        for i, name in enumerate(self.stages):
+            h = self.hist[i]; n = int(h.sum())
+            if not n: continue
+            cum = np.cumsum(h)
+            pct = lambda q: (EDGES_US + ("inf",))[int(np.searchsorted(cum, q * n))]
+            stages[name] = {"count": n, "mean_us": self.total_ns[i] / n / 1000, "worst_us": self.worst_ns[i] / 1000,
+                            "p50_us_le": pct(0.5), "p99_us_le": pct(0.99), "histogram": h.tolist()}
+        presets = {k: {"blocks": r[0], "mean_load": r[1] / r[0] / self.deadline_ns, "worst_load": r[2] / self.deadline_ns, "deadline_misses": r[3]}
+                   for k, r in self.by_preset.items() if r[0]}
+        return {
+            "blocks": self.blocks, "deadline_us": self.deadline_ns / 1000,
+            "load": self.load, "peak_load": self.peak_load, "deadline_misses": self.deadline_misses,
+            "xruns": self.xruns, "input_underflow": self.input_underflow, "input_overflow": self.input_overflow,
+            "output_underflow": self.output_underflow, "output_overflow": self.output_overflow,
+            "exceptions": self.exceptions, "last_exception": self.last_exception,
+            "round_trip_ms": self.round_trip_ms, "nominal_latency_ms": self.nominal_ms,
+            "histogram_edges_us": list(EDGES_US), "stages": stages, "presets": presets,
+            "preset_switch": {"count": self.switches, "last_ms": self.switch_last_ns / 1e6, "worst_ms": self.switch_worst_ns / 1e6,
+                              "mean_ms": self.switch_total_ns / self.switches / 1e6 if self.switches else 0.0},
+        }
+
+    def dump(self, path=None):
+        text = json.dumps(self.snapshot(), indent=1)
+        if path:
+            with open(path, "w") as f: f.write(text)
+        return text
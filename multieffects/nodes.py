@@ -0,0 +1,196 @@
+import numpy as np
+from dsp import Modulator, Delay, Reverb, EQ, Gate
+from waveshaper import Waveshaper, OVERSAMPLING
+from convolver import Convolver, ir_partitions, max_partitions
+
+# --- Effect nodes: what the engine chains together ---
+#
+# A node owns its DSP state and buffers. compile() runs on the UI thread and turns the
+# preset dict into an immutable params tuple; process() runs on the audio thread with
+# that tuple and must not touch the preset, working in place in the engine's dtype with
+# buffers allocated here up front, or in prepare(), which the engine calls on every voice's
+# node with the compiled params before they are published. reset() may run on the audio
+# thread too, so it only clears existing buffers. A new effect is a subclass decorated with @register, plus
+# a "<Name>" on/off flag and a place in the preset's "Chain".
+
+NODES = {} # name -> node class, in registration order (also the monitor's stage order)
+
+def register(cls):
+    NODES[cls.name] = cls
+    return cls
+
+def preset_irs(state):
+    # (kind, name) of the impulse responses a preset plays through
+    return [(k, v) for k, v in (("cab", state["Amp_Params"].get("Cab", "")), ("room", state["Rev_Params"].get("IR", ""))) if v]
+
+def impulse(node, kind, name):
+    # compile() helper: partition spectra of the named IR; a preset naming one that isn't
+    # installed on this machine plays without it
+    if not name: return None
+    try: return ir_partitions(kind, name, node.fs, node.block_size, node.dtype)
+    except (OSError, ValueError): return None
+
+
+class Node:
+    name = ""
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        self.fs = fs
+        self.block_size = block_size
+        self.dtype = dtype
+
+    def compile(self, state):
+        return ()
+
+    def prepare(self, params):
+        # UI thread: grow buffers params need (compile() runs on one voice's nodes only)
+        pass
+
+    def process(self, sig, params):
+        return sig
+
+    def tail(self, params):
+        # samples this node keeps sounding after its input stops; > 0 makes it spill over a preset switch
+        return 0
+
+    def reset(self):
+        pass
+
+
+@register
+class AmpNode(Node):
+    name = "Amp"
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        super().__init__(fs, block_size, dtype)
+        self.shaper = Waveshaper(block_size=block_size, dtype=dtype) # Drive_Mode / Gain / Warmth curve as a lookup table
+        self.eq = EQ(fs, dtype=dtype) # Bas / Mid / Tre
+        self.cab = Convolver(block_size, max_partitions("cab", fs, block_size), dtype) # speaker cabinet IR (Cab)
+
+    def compile(self, state):
+        a = state["Amp_Params"]
+        oversample = a.get("Oversample", 1)
+        return (self.shaper.curve(a.get("Drive_Mode", "Clean"), a["Gain"], a.get("Warmth", 0)),
+                oversample if oversample in OVERSAMPLING else 1,
+                self.eq.coefficients(a["Bas"], a["Mid"], a["Tre"]), a["Vol"] / 100, impulse(self, "cab", a.get("Cab", "")))
+
+    def drive(self, sig, params):
+        return self.shaper.process(sig, params[0], params[1])
+
+    def tone(self, sig, params):
+        return self.eq.process(sig, params[2]) # 3-band EQ (cascaded biquad SOS)
+
+    def cabinet(self, sig, params):
+        return sig if params[4] is None else self.cab.process(sig, params[4], sig)
+
+    def prepare(self, params):
+        if params[4] is not None: self.cab.reserve(len(params[4]))
+
+    def process(self, sig, params):
+        sig = self.drive(sig, params)
+        sig = self.tone(sig, params)
+        sig = self.cabinet(sig, params)
+        sig *= params[3]
+        return sig
+
+    def reset(self):
+        self.shaper.reset()
+        self.eq.reset()
+        self.cab.reset()
+
+
+@register
+class GateNode(Node):
+    name = "Gate"
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        super().__init__(fs, block_size, dtype)
+        self.gate = Gate(fs, block_size, dtype)
+
+    @property
+    def gain(self):
+        return self.gate.gain # smoothed gain at the end of the last block, for the meters
+
+    def compile(self, state):
+        return 10**(state.get("Gate_Threshold", -45) / 20)
+
+    def process(self, sig, thresh):
+        return self.gate.process(sig, thresh)
+
+    def reset(self):
+        self.gate.reset()
+
+
+@register
+class ModNode(Node):
+    name = "Mod"
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        super().__init__(fs, block_size, dtype)
+        self.modulator = Modulator(fs, block_size, dtype)
+
+    def compile(self, state):
+        m = state["Mod_Params"]; types = Modulator.MOD_TYPES
+        return (types.index(m["Type"]) if m["Type"] in types else Modulator.CHORUS, float(m["Rate"]), m["Depth"] / 100.0)
+
+    def process(self, sig, params):
+        return self.modulator.process(sig, *params)
+
+    def reset(self):
+        self.modulator.reset()
+
+
+@register
+class DlyNode(Node):
+    name = "Dly"
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        super().__init__(fs, block_size, dtype)
+        self.delay = Delay(fs, block_size, dtype=dtype)
+
+    def compile(self, state):
+        d = state["Dly_Params"]
+        return (self.delay.samples(d["Time"]), d["Feedback"] / 100, d["Mix"] / 100)
+
+    def process(self, sig, params):
+        return self.delay.process(sig, *params)
+
+    def tail(self, params):
+        return int(params[0])
+
+    def reset(self):
+        self.delay.reset()
+
+
+@register
+class RevNode(Node):
+    name = "Rev"
+
+    def __init__(self, fs, block_size, dtype=np.float64):
+        super().__init__(fs, block_size, dtype)
+        self.reverb = Reverb(fs, block_size, dtype)
+        self.room = Convolver(block_size, max_partitions("room", fs, block_size), dtype) # room IR (Rev_Params IR), instead of the algorithm
+        self._wet = np.empty(block_size, dtype)
+
+    def compile(self, state):
+        rv = state["Rev_Params"]
+        # Size 10..95 -> RT60 about 0.3 .. 6.5 s
+        return (self.reverb.coefficients(0.2 * 40 ** (rv["Size"] / 100.0), rv.get("Damp", 30) / 100.0), rv["Mix"] / 100.0,
+                impulse(self, "room", rv.get("IR", "")))
+
+    def process(self, sig, params):
+        coeffs, mix, room = params
+        if room is None: return self.reverb.process(sig, coeffs, mix)
+        wet = self.room.process(sig, room, self._wet[:len(sig)])
+        sig *= (1 - mix); wet *= mix; sig += wet
+        return sig
+
+    def prepare(self, params):
+        if params[2] is not None: self.room.reserve(len(params[2]))
+
+    def tail(self, params):
+        return self.reverb.tail() if params[2] is None else len(params[2]) * self.block_size
+
+    def reset(self):
+        self.reverb.reset()
+        self.room.reset()
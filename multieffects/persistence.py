@@ -0,0 +1,96 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- Write-behind persistence for the preset bank ---
+
+def atomic_write_json(path, data):
+    # temp file in the same directory + fsync + rename: a power cut leaves either the old or the new file
+    path = os.path.abspath(path)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(os.path.dirname(path), os.O_RDONLY)
+        try: os.fsync(fd)
+        finally: os.close(fd)
+    except OSError: pass # directories can't be fsynced on every platform
+
+
+class PresetWriter:
+    """Coalesces preset edits and writes the bank file from a background thread.
+
+    The UI calls mark_dirty() as often as it likes (every slider tick); the file is written
+    once edits have been quiet for `quiet` seconds, at least every `max_delay` seconds while
+    they keep coming, and on close(). With a presetdb.PresetStore as `store`, only the edited
+    presets are saved, as rows, instead of rewriting the whole file.
+    """
+
+    def __init__(self, path, data, quiet=0.5, max_delay=5.0, write=atomic_write_json, store=None):
+        self.path = path
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.write = write
+        self.writes = 0
+        self.last_error = None
+        self.store = store
+        self._shadow = copy.deepcopy(data) if store is None else None # the writer's own copy, never touched by the UI thread
+        self._pending = {} # (bank, slot) -> latest copy of that preset
+        self._first = self._last = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="preset-writer", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, bank, slot, preset):
+        snap = copy.deepcopy(preset)
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending: self._first = now
+            self._pending[(str(bank), slot)] = snap
+            self._last = now
+        self._wake.set()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending: return
+        try:
+            if self.store is not None: self.store.put_many(pending)
+            else:
+                for (bank, slot), preset in pending.items(): self._shadow.setdefault(bank, {})[slot] = preset
+                self.write(self.path, self._shadow)
+            self.writes += 1
+        except (OSError, sqlite3.Error) as e:
+            self.last_error = e
+            print(f"Preset save failed: {e}")
+            with self._lock: # keep the edits so the next flush tries again
+                for k, v in pending.items(): self._pending.setdefault(k, v)
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            while not self._closed:
+                with self._lock:
+                    if not self._pending: break
+                    now = time.monotonic()
+                    due = min(self._last + self.quiet, self._first + self.max_delay)
+                if now >= due:
+                    self.flush()
+                    break
+                self._wake.wait(due - now) # a new edit wakes us early and pushes `due` back
+                self._wake.clear()
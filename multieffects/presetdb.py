@@ -0,0 +1,170 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from presets import load_bank, default_preset, upgrade_preset, SLOTS
+
+# --- Preset library in SQLite (WAL): one row per preset, banks loaded when first used ---
+#
+# PresetStore is a read-only Mapping bank -> {slot: preset}, so it drops in wherever the JSON
+# bank dict was used (engine.presets, render, bench). A bank is read from the database the
+# first time it's asked for and kept, and the dicts handed out are the ones the UI edits;
+# PresetWriter saves the edited ones back with put_many(), one row per preset.
+#
+#   python presetdb.py presets.db export live.mtfx --banks 1 2
+#   python presetdb.py presets.db import live.mtfx            (as new banks after the last one)
+#   python presetdb.py presets.db import live.mtfx --replace  (into the banks named in the pack)
+
+LEGACY_JSON = "bank_presets_pro.json" # imported once, when a store is created next to it
+PACK_FORMAT = "mtfx-pack"
+
+def _v1(db):
+    db.execute("CREATE TABLE banks (name TEXT PRIMARY KEY, position INTEGER NOT NULL)")
+    db.execute("CREATE TABLE presets (bank TEXT NOT NULL REFERENCES banks(name), slot TEXT NOT NULL, data TEXT NOT NULL, "
+               "modified REAL NOT NULL, PRIMARY KEY (bank, slot))")
+
+def _fill(db, defaults):
+    # add keys a version introduced to every stored preset, with the defaults they had in that version
+    # (a dict value adds its missing subkeys); frozen literals, never today's default_preset()
+    for bank, slot, data in db.execute("SELECT bank, slot, data FROM presets").fetchall():
+        p = json.loads(data)
+        for k, v in defaults.items():
+            if k not in p: p[k] = v
+            elif isinstance(v, dict) and isinstance(p[k], dict):
+                for kk, vv in v.items(): p[k].setdefault(kk, vv)
+        new = json.dumps(p)
+        if new != data: db.execute("UPDATE presets SET data = ? WHERE bank = ? AND slot = ?", (new, bank, slot))
+
+def _v2(db):
+    # everything up to Chain / Oversample
+    _fill(db, {
+        "Name": "", "Gate": False, "Amp": False, "Mod": False, "Dly": False, "Rev": False,
+        "Gate_Threshold": -45, "Notes": "", "Chain": ["Amp", "Gate", "Mod", "Dly", "Rev"],
+        "Amp_Params": {"Vol": 50, "Gain": 30, "Bas": 50, "Mid": 50, "Tre": 50, "Drive_Mode": "Clean", "Warmth": 0, "Oversample": 1},
+        "Mod_Params": {"Type": "Chorus", "Rate": 1.5, "Depth": 50},
+        "Dly_Params": {"Time": 300, "Feedback": 30, "Mix": 30},
+        "Rev_Params": {"Size": 50, "Damp": 30, "Mix": 20},
+    })
+
+def _v3(db):
+    # cabinet and room impulse responses, none by default
+    _fill(db, {"Amp_Params": {"Cab": ""}, "Rev_Params": {"IR": ""}})
+
+MIGRATIONS = [_v1, _v2, _v3] # schema version n = MIGRATIONS[:n] applied; append, never edit
+
+
+class PresetStore(Mapping):
+    def __init__(self, path, legacy=None):
+        self.path = path
+        self._local = threading.local() # one connection per thread: the preset writer saves from its own
+        self._banks = {} # bank -> {slot: preset}, filled lazily
+        try:
+            created = self._migrate()
+        except sqlite3.DatabaseError as e:
+            # not a database (or damaged beyond reading): keep it for recovery, start a new one
+            aside = f"{path}.corrupt-{int(time.time())}"
+            self.close(); os.replace(path, aside)
+            print(f"Preset database unreadable ({e}); kept as {aside}")
+            created = self._migrate()
+        if created:
+            legacy = legacy or os.path.join(os.path.dirname(os.path.abspath(path)), LEGACY_JSON)
+            self.put_banks(load_bank(legacy)) # the old bank file, or 9 default banks when there is none
+        self._order = self._bank_names()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL") # readers never wait for the writer thread
+            db.execute("PRAGMA synchronous=NORMAL") # WAL stays consistent across a power cut; may lose the last commit
+        return db
+
+    def _migrate(self):
+        db = self._db()
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        for n, step in enumerate(MIGRATIONS[version:], version + 1):
+            with db: # one transaction per step, version bump included
+                step(db)
+                db.execute(f"PRAGMA user_version = {n}")
+        return version == 0
+
+    def _bank_names(self):
+        return [r[0] for r in self._db().execute("SELECT name FROM banks ORDER BY position")]
+
+    # --- Mapping: bank -> {slot: preset} ---
+    def __getitem__(self, bank):
+        bank = str(bank)
+        presets = self._banks.get(bank)
+        if presets is None:
+            if bank not in self._order: raise KeyError(bank)
+            rows = self._db().execute("SELECT slot, data FROM presets WHERE bank = ?", (bank,)).fetchall()
+            presets = {slot: json.loads(data) for slot, data in rows}
+            for slot in SLOTS: presets.setdefault(slot, default_preset())
+            self._banks[bank] = presets
+        return presets
+
+    def __iter__(self): return iter(self._order)
+    def __len__(self): return len(self._order)
+    def __contains__(self, bank): return str(bank) in self._order
+
+    # --- Saving ---
+    def put_many(self, presets):
+        # {(bank, slot): preset} in one transaction; new banks go after the last one
+        db = self._db(); now = time.time()
+        with db:
+            for (bank, slot), p in presets.items():
+                db.execute("INSERT OR IGNORE INTO banks (name, position) SELECT ?, COALESCE(MAX(position), 0) + 1 FROM banks", (str(bank),))
+                db.execute("INSERT OR REPLACE INTO presets (bank, slot, data, modified) VALUES (?, ?, ?, ?)", (str(bank), slot, json.dumps(p), now))
+        self._order = self._bank_names()
+
+    def put(self, bank, slot, preset):
+        self.put_many({(bank, slot): preset})
+
+    def put_banks(self, banks):
+        self.put_many({(b, s): p for b, slots in banks.items() for s, p in slots.items()})
+        for b in banks: self._banks.pop(str(b), None) # re-read on next use
+
+    # --- Preset packs: a JSON file of whole banks, to share or back up ---
+    def export_pack(self, path, banks=None):
+        banks = [str(b) for b in banks] if banks else list(self)
+        pack = {"format": PACK_FORMAT, "version": len(MIGRATIONS), "banks": {b: self[b] for b in banks}}
+        with open(path, "w") as f: json.dump(pack, f, indent=1)
+        return len(banks)
+
+    def import_pack(self, path, replace=False):
+        # replace: into the banks named in the pack; otherwise as new banks after the last one
+        with open(path) as f: pack = json.load(f)
+        banks = pack["banks"] if pack.get("format") == PACK_FORMAT else pack # a plain bank file works too
+        if not replace:
+            first = max([int(b) for b in self if b.isdigit()] + [0]) + 1
+            banks = {str(first + i): slots for i, slots in enumerate(banks.values())}
+        banks = {b: {s: upgrade_preset(p) for s, p in slots.items() if s in SLOTS} for b, slots in banks.items()}
+        self.put_banks(banks)
+        return list(banks)
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None: db.close(); self._local.db = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import / export preset packs.")
+    ap.add_argument("db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export"); ex.add_argument("pack"); ex.add_argument("--banks", nargs="+", help="default: all")
+    im = sub.add_parser("import"); im.add_argument("pack"); im.add_argument("--replace", action="store_true", help="overwrite the banks named in the pack")
+    sub.add_parser("list")
+    args = ap.parse_args()
+
+    store = PresetStore(args.db)
+    if args.cmd == "export": print(f"{store.export_pack(args.pack, args.banks)} banks written to {args.pack}")
+    elif args.cmd == "import": print(f"Imported as bank(s) {', '.join(store.import_pack(args.pack, args.replace))}")
+    else:
+        for b in store: print(b, " | ".join(f"{s}: {p.get('Name', '')}" for s, p in store[b].items()))
+    store.close()
+
+if __name__ == "__main__":
+    main()
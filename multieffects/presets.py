@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+# --- Preset bank file (bank_presets_pro.json) ---
+
+BANKS = [str(b) for b in range(1, 10)]
+SLOTS = ["A", "B", "C", "D"]
+DEFAULT_CHAIN = ["Amp", "Gate", "Mod", "Dly", "Rev"] # signal order; each preset keeps its own copy in "Chain"
+
+def default_preset():
+    return {
+        "Name": "", "Gate": False, "Amp": False, "Mod": False, "Dly": False, "Rev": False,
+        "Gate_Threshold": -45, "Notes": "", "Chain": list(DEFAULT_CHAIN),
+        "Amp_Params": {"Vol": 50, "Gain": 30, "Bas": 50, "Mid": 50, "Tre": 50, "Drive_Mode": "Clean", "Warmth": 0, "Oversample": 1, "Cab": ""},
+        "Mod_Params": {"Type": "Chorus", "Rate": 1.5, "Depth": 50},
+        "Dly_Params": {"Time": 300, "Feedback": 30, "Mix": 30},
+        "Rev_Params": {"Size": 50, "Damp": 30, "Mix": 20, "IR": ""} # Cab / IR: names in irs/cab, irs/room ("" = none)
+    }
+
+def default_bank():
+    return {b: {l: default_preset() for l in SLOTS} for b in BANKS}
+
+def step_bank(banks, bank, step):
+    # the bank `step` places on from `bank` in the store's order, wrapping round (packs add banks after 9)
+    names = list(banks)
+    return names[(names.index(str(bank)) + step) % len(names)]
+
+def upgrade_preset(p):
+    # fill in whatever an older version didn't save yet (Gate, Rev_Params, Warmth, Notes, ...), in place
+    for k, v in default_preset().items():
+        if k not in p: p[k] = v
+        elif isinstance(v, dict) and isinstance(p[k], dict):
+            for kk, vv in v.items(): p[k].setdefault(kk, vv)
+    return p
+
+def load_bank(db_file):
+    # a .db path is a PresetStore (lazy, per-preset saves); anything else the JSON bank file
+    if db_file.endswith(".db"):
+        from presetdb import PresetStore
+        return PresetStore(db_file)
+    if not os.path.exists(db_file): return default_bank()
+    try:
+        with open(db_file, 'r') as f: data = json.load(f)
+        for b in data:
+            for p in data[b]: upgrade_preset(data[b][p])
+        return data
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        # keep the unreadable file for recovery instead of letting the next save overwrite it
+        aside = f"{db_file}.corrupt-{int(time.time())}"
+        try: os.replace(db_file, aside)
+        except OSError: aside = db_file
+        print(f"Preset file unreadable ({e}); kept as {aside}, starting from defaults")
+        return default_bank()
@@ -0,0 +1,94 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.io import wavfile
+from engine import FXEngine
+from presets import load_bank, SLOTS
+
+# Offline render: run WAV files through a stored preset without a window or sound card.
+#
+#   python render.py render di.wav out.wav --preset 1A
+#   python render.py batch di1.wav di2.wav --presets 1A 3C --out-dir renders -j 4
+#   python render.py batch takes/*.wav --all-presets --out-dir renders
+
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "presets.db") # the app's store (presetdb.py)
+READ_BLOCK = 65536 # samples pulled from the (memory-mapped) input at a time
+
+def to_float(x):
+    # WAV integer formats -> float in [-1, 1]
+    if x.dtype == np.uint8: return (x.astype(np.float64) - 128) / 128
+    if x.dtype.kind == "i": return x.astype(np.float64) / (2**(8 * x.dtype.itemsize - 1))
+    return x.astype(np.float64)
+
+def parse_preset(code):
+    # "1A" -> ("1", "A"); the bank is checked against the store once it's open
+    bank, slot = code[:-1], code[-1].upper()
+    if not bank or slot not in SLOTS:
+        raise argparse.ArgumentTypeError(f"bad preset '{code}', expected a bank and slot A-D, e.g. 3C")
+    return bank, slot
+
+def render_file(in_path, out_path, preset, block_size=4096, tail=2.0):
+    fs, data = wavfile.read(in_path, mmap=True)
+    if data.ndim > 1: data = data[:, 0] # same as the live input: first channel only
+
+    engine = FXEngine(fs, block_size)
+    engine.set_preset(preset)
+    n = len(data) + int(tail * fs) # let delay / reverb ring out
+    out = np.empty(n, dtype=np.float32)
+    for s in range(0, len(data), READ_BLOCK):
+        e = min(s + READ_BLOCK, len(data))
+        out[s:e] = engine.process(to_float(data[s:e]))
+    if n > len(data):
+        out[len(data):] = engine.process(np.zeros(n - len(data)))
+    wavfile.write(out_path, fs, out)
+    return out_path, n / fs
+
+def _render_job(job):
+    in_path, out_path, (bank, slot), db_file, block_size, tail = job
+    preset = load_bank(db_file)[bank][slot]
+    return render_file(in_path, out_path, preset, block_size, tail)
+
+def main():
+    ap = argparse.ArgumentParser(description="Render WAV files through SunsetZ MTFX-01 presets, faster than real time.")
+    ap.add_argument("--db", default=DB_FILE, help="preset store, or a JSON bank file (default: %(default)s)")
+    ap.add_argument("--block", type=int, default=4096, help="DSP block size in samples")
+    ap.add_argument("--tail", type=float, default=2.0, help="seconds of silence appended so effects can decay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("render", help="one file through one preset")
+    r.add_argument("input"); r.add_argument("output")
+    r.add_argument("--preset", type=parse_preset, required=True, help="bank and slot, e.g. 1A")
+
+    b = sub.add_parser("batch", help="many files x many presets on a process pool")
+    b.add_argument("inputs", nargs="+")
+    g = b.add_mutually_exclusive_group(required=True)
+    g.add_argument("--presets", type=parse_preset, nargs="+", help="e.g. 1A 2C 9D")
+    g.add_argument("--all-presets", action="store_true", help="every stored preset (all banks x 4)")
+    b.add_argument("--out-dir", required=True)
+    b.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes (default: all cores)")
+    args = ap.parse_args()
+
+    store = load_bank(args.db)
+    missing = sorted({b for b, _ in ([args.preset] if args.cmd == "render" else args.presets or [])} - set(store))
+    if missing: ap.error(f"no bank {', '.join(missing)} in {args.db} (banks: {' '.join(store)})")
+
+    if args.cmd == "render":
+        bank, slot = args.preset
+        path, secs = render_file(args.input, args.output, store[bank][slot], args.block, args.tail)
+        print(f"{path}: {secs:.1f}s rendered with preset {bank}{slot}")
+        return
+
+    presets = [(b, s) for b in store for s in SLOTS] if args.all_presets else args.presets
+    os.makedirs(args.out_dir, exist_ok=True)
+    jobs = []
+    for in_path in args.inputs:
+        stem = os.path.splitext(os.path.basename(in_path))[0]
+        for bank, slot in presets:
+            jobs.append((in_path, os.path.join(args.out_dir, f"{stem}_{bank}{slot}.wav"), (bank, slot), args.db, args.block, args.tail))
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for path, secs in pool.map(_render_job, jobs):
+            print(f"{path}: {secs:.1f}s")
+
+if __name__ == "__main__":
+    main()
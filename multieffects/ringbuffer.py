@@ -0,0 +1,72 @@
+import numpy as np
+
+# --- Lock-free single-producer / single-consumer sample ring ---
+#
+# The audio callback is the only writer and only ever advances `head`; one consumer thread
+# is the only reader and only advances `tail`. Both are plain ints counting samples since
+# the start, and each side publishes its counter only after the samples are in place, so
+# neither side ever needs a lock. If the reader falls more than a ring behind, it skips
+# ahead and counts the lost samples instead of blocking the writer.
+#
+# `head` lives in the same memory block as the samples, so the ring can be built in a
+# multiprocessing SharedMemory and written by one process while another reads it.
+# With width > 1 each slot holds a row of that many values (a per-block record) instead of a sample.
+
+class SampleRing:
+    def __init__(self, capacity, dtype=np.float32, memory=None, width=1):
+        # memory: optional buffer of nbytes(capacity, dtype, width) bytes to build the ring in
+        assert capacity & (capacity - 1) == 0, "capacity must be a power of two"
+        if memory is None: memory = bytearray(self.nbytes(capacity, dtype, width))
+        self._head = np.ndarray(1, np.int64, memory) # samples written (writer only)
+        self.buf = np.ndarray((capacity, width) if width > 1 else capacity, dtype, memory, offset=8)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.tail = 0 # samples consumed (reader only)
+        self.dropped = 0 # samples the reader lost by falling behind (reader only)
+
+    @staticmethod
+    def nbytes(capacity, dtype=np.float32, width=1):
+        return 8 + capacity * width * np.dtype(dtype).itemsize
+
+    @property
+    def head(self):
+        return int(self._head[0])
+
+    # --- writer (audio thread), never allocates ---
+    def write(self, x):
+        n = len(x)
+        if n > self.capacity: x = x[n - self.capacity:]; n = self.capacity
+        i = self.head & self.mask
+        k = min(n, self.capacity - i)
+        self.buf[i:i + k] = x[:k]
+        if k < n: self.buf[:n - k] = x[k:]
+        self._head[0] += n # publish
+
+    # --- reader ---
+    def available(self):
+        return self.head - self.tail
+
+    def read(self, out):
+        # consume up to len(out) of the oldest unread samples into out; returns how many
+        head = self.head
+        if head - self.tail > self.capacity:
+            self.dropped += head - self.tail - self.capacity
+            self.tail = head - self.capacity
+        n = min(len(out), head - self.tail)
+        self._copy(self.tail, n, out)
+        self.tail += n
+        return n
+
+    def latest(self, out):
+        # copy the newest len(out) samples into out without consuming; False until that many exist
+        head = self.head
+        n = len(out)
+        if n > self.capacity or head < n: return False
+        self._copy(head - n, n, out)
+        return True
+
+    def _copy(self, start, n, out):
+        i = start & self.mask
+        k = min(n, self.capacity - i)
+        out[:k] = self.buf[i:i + k]
+        if k < n: out[k:n] = self.buf[:n - k]
@@ -0,0 +1,38 @@
+import numpy as np
+from convolver import Convolver, partition
+
+# Chunked input through the Convolver must match one long np.convolve, whatever the chunking.
+
+def run(h, x, block_size, chunks, dtype=np.float64):
+    H = partition(h, block_size, dtype)
+    conv = Convolver(block_size, len(H), dtype)
+    conv.reserve(len(H))
+    out = np.empty(len(x), dtype); s = 0
+    for n in chunks:
+        out[s:s + n] = conv.process(x[s:s + n].astype(dtype), H, np.empty(n, dtype)); s += n
+    return out
+
+def test_chunked_matches_convolve():
+    rng = np.random.default_rng(1)
+    h = rng.standard_normal(1000) * np.exp(-np.arange(1000) / 200); x = rng.standard_normal(5000)
+    want = np.convolve(x, h)[:len(x)]
+    for chunks in ([256] * 19 + [136], [200] * 25, [1000] * 5, [1, 255, 300, 7, 1024, 513] + [100] * 29):
+        assert sum(chunks) == len(x)
+        np.testing.assert_allclose(run(h, x, 256, chunks), want, atol=1e-9)
+
+def test_reset_and_float32():
+    rng = np.random.default_rng(2)
+    h = rng.standard_normal(300); x = rng.standard_normal(2048)
+    H = partition(h, 128, np.float32)
+    conv = Convolver(128, len(H), np.float32); conv.reserve(len(H))
+    conv.process(rng.standard_normal(700).astype(np.float32), H, np.empty(700, np.float32)) # leaves a partial partition behind
+    conv.reset()
+    out = np.concatenate([conv.process(x[s:s + 100].astype(np.float32), H, np.empty(len(x[s:s + 100]), np.float32)) for s in range(0, len(x), 100)])
+    np.testing.assert_allclose(out, np.convolve(x, h)[:len(x)], atol=1e-4)
+
+def test_history_grows_with_reserve():
+    conv = Convolver(64, 100)
+    assert conv._hist[1].shape[0] == 1
+    conv.reserve(10); assert conv._hist[1].shape[0] == 10
+    conv.reserve(5); assert conv._hist[1].shape[0] == 10
+    conv.reserve(1000); assert conv._hist[1].shape[0] == 100
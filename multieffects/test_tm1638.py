@@ -0,0 +1,56 @@
+import pytest
+from tm1638 import TM1638, SimGPIO, SEGMENTS, KEY_BITS, FIXED, AUTO, NO_BOARD
+
+# The TM1638 driver against SimGPIO, which decodes the bus into a model of the chip.
+
+def board():
+    sim = SimGPIO(17, 27, 22)
+    return TM1638(17, 27, 22, gpio=sim), sim
+
+def test_unchanged_text_sends_nothing():
+    b, sim = board()
+    b.set_text("1A  ")
+    assert sim.ram[0] == SEGMENTS["1"] and sim.ram[2] == SEGMENTS["A"]
+    sent = b.bytes_sent
+    b.set_text("1A  ")
+    assert b.bytes_sent == sent
+
+def test_one_led_is_a_fixed_address_write():
+    b, sim = board()
+    b.set_text("88888888")
+    sent = b.bytes_sent
+    b.set_led(5, True)
+    assert b.bytes_sent - sent == 3 # FIXED, then address and data
+    assert sim._mode == FIXED and sim.ram[11] == 1
+    b.set_text("1234 888", flush=False); b.set_leds([1, 1, 1, 1, 0, 1, 0, 0]) # a solid run of changes goes as one auto-increment write
+    assert sim._mode == AUTO and b.bytes_sent - sent == 3 + 2 + 9 # digits 0-4 and LEDs 0-3: addresses 0-8
+    assert list(sim.ram[1::2]) == [1, 1, 1, 1, 0, 1, 0, 0] and sim.ram[6] == SEGMENTS["4"] and sim.ram[8] == 0
+
+def scan(b, sim, script, debounce=2):
+    # run the scan loop over one key word per scan, then collect its events
+    words = iter(script); read = b.read_keys
+    def scripted():
+        w = next(words, None)
+        if w is None: b._stop.set(); return read()
+        sim.keys = w
+        return read()
+    b.read_keys = scripted
+    b._scan_loop(0.0, debounce, 0)
+    events = []
+    while not b.events.empty(): key, pressed, _ = b.events.get(); events.append((key, pressed))
+    return events
+
+def test_debounced_press_and_release():
+    b, sim = board()
+    k2 = 1 << KEY_BITS[2]
+    assert scan(b, sim, [0, k2, 0, 0, k2, k2, k2, 0, 0]) == [(2, True), (2, False)] # the single-scan blip is dropped
+
+def test_two_keys_one_scan():
+    b, sim = board()
+    both = 1 << KEY_BITS[0] | 1 << KEY_BITS[7]
+    assert scan(b, sim, [both, both, 1 << KEY_BITS[7], 1 << KEY_BITS[7]]) == [(0, True), (7, True), (0, False)]
+
+def test_no_board():
+    sim = SimGPIO(17, 27, 22); sim.keys = NO_BOARD
+    with pytest.raises(RuntimeError):
+        TM1638(17, 27, 22, gpio=sim)
@@ -1,59 +1,220 @@
-import RPi.GPIO as GPIO # pyright: ignore[reportMissingModuleSource]
+import os
+import queue
+import threading
 import time
 
+# --- TM1638 LED&KEY board: 8 x 7-segment digits, 8 LEDs, 8 keys on a 3-wire bus ---
+#
+# The chip's display RAM is 16 bytes, digit and LED interleaved (even = segments of digit n,
+# odd = LED n). The driver keeps a shadow of what the chip holds and only sends the bytes that
+# changed, each frame in whichever addressing mode needs fewer bytes on the bus. Keys are
+# scanned on a thread of its own, debounced, and handed out as edge events on a queue.
+#
+# `gpio` is anything with the RPi.GPIO surface used below: the RPi.GPIO module itself on the Pi,
+# or SimGPIO to run without the board (it decodes the bus into a model of the chip).
+
+SEGMENTS = {'0':0x3f,'1':0x06,'2':0x5b,'3':0x4f,'4':0x66,'5':0x6d,'6':0x7d,'7':0x07,'8':0x7f,'9':0x6f,
+            'A':0x77,'b':0x7c,'C':0x39,'d':0x5e,'E':0x79,'F':0x71,'P':0x73,'n':0x54,'o':0x5c,'r':0x50,'t':0x78,' ':0x00,'-':0x40}
+KEY_BITS = (0, 8, 16, 24, 1, 9, 17, 25) # key n -> bit of the 32-bit scan word
+DIGITS = 8
+AUTO, FIXED, READ = 0x40, 0x44, 0x42 # data commands: auto-increment write, fixed-address write, key scan
+ADDRESS = 0xC0
+NO_BOARD = 0xFFFFFFFF # key word read off a floating, pulled-up DIO: the chip never sets the unused bits
+
+def default_gpio():
+    import RPi.GPIO as GPIO # pyright: ignore[reportMissingModuleSource]
+    GPIO.setwarnings(False)
+    GPIO.setmode(GPIO.BCM)
+    return GPIO
+
+
 class TM1638:
-    def __init__(self, dio, clk, stb):
+    def __init__(self, dio, clk, stb, gpio=None, brightness=7):
         self.dio = dio
         self.clk = clk
         self.stb = stb
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.stb, GPIO.OUT)
-        GPIO.setup(self.clk, GPIO.OUT)
-        GPIO.setup(self.dio, GPIO.OUT)
-        self._write_command(0x88 | 7) # เปิดหน้าจอ ความสว่างสูงสุด
+        self.gpio = gpio if gpio is not None else default_gpio()
+        self.gpio.setup(self.stb, self.gpio.OUT)
+        self.gpio.setup(self.clk, self.gpio.OUT)
+        self.gpio.setup(self.dio, self.gpio.OUT)
+        self._bus = threading.Lock() # display writes (UI thread) and key scans (scan thread) share the wires
+        self._dio_level = None # last level driven on dio: unchanged bits skip that GPIO call
+        self._want = bytearray(2 * DIGITS) # what the display should show
+        self._ram = bytearray(2 * DIGITS) # what the chip holds (after the full clear below)
+        self.bytes_sent = 0 # bus bytes written since start, to see what the diffing saves
+        self.events = queue.Queue() # (key, pressed, perf_counter_ns of the scan that saw the edge)
+        self._scan = None
+        self._stop = threading.Event()
+        with self._bus:
+            self._send([AUTO]); self._send([ADDRESS] + [0] * len(self._ram))
+            self._send([0x88 | brightness]) # เปิดหน้าจอ ความสว่าง 0-7
+        # with RPi.GPIO present but nothing on the pins every write "works"; the first scan tells
+        # (left alone, it would read as all eight keys pressed at once)
+        if self.read_keys() == NO_BOARD: raise RuntimeError(f"no TM1638 answering on dio {dio} / clk {clk} / stb {stb}")
 
+    # --- Bus ---
     def _write_byte(self, b):
+        out, clk, dio = self.gpio.output, self.clk, self.dio
         for i in range(8):
-            GPIO.output(self.clk, GPIO.LOW)
-            GPIO.output(self.dio, (b >> i) & 1)
-            GPIO.output(self.clk, GPIO.HIGH)
+            bit = (b >> i) & 1
+            out(clk, 0)
+            if bit != self._dio_level: out(dio, bit); self._dio_level = bit
+            out(clk, 1)
+
+    def _send(self, data):
+        # one strobe frame: a command byte and whatever follows it
+        self.gpio.output(self.stb, 0)
+        for b in data: self._write_byte(b)
+        self.gpio.output(self.stb, 1)
+        self.bytes_sent += len(data)
 
     def _write_command(self, cmd):
-        GPIO.output(self.stb, GPIO.LOW)
-        self._write_byte(cmd)
-        GPIO.output(self.stb, GPIO.HIGH)
+        with self._bus: self._send([cmd])
 
-    def set_text(self, text):
+    def flush(self):
+        # send what differs between _want and _ram: one auto-increment run over the changed
+        # span (command, address, span bytes) or fixed-address pairs (command, then address and
+        # byte each), whichever is fewer bytes on the bus; a tie (one byte) goes fixed
+        changed = [i for i in range(len(self._want)) if self._want[i] != self._ram[i]]
+        if not changed: return
+        lo, hi = changed[0], changed[-1]
+        with self._bus:
+            if 2 + (hi - lo + 1) < 1 + 2 * len(changed):
+                self._send([AUTO]); self._send([ADDRESS | lo] + list(self._want[lo:hi + 1]))
+            else:
+                self._send([FIXED])
+                for i in changed: self._send([ADDRESS | i, self._want[i]])
+        self._ram[:] = self._want
+
+    # --- Display ---
+    def set_text(self, text, flush=True):
         # แปลงตัวอักษรเป็น 7-segment (เบื้องต้น)
-        segments = {'0':0x3f,'1':0x06,'2':0x5b,'3':0x4f,'4':0x66,'5':0x6d,'6':0x7d,'7':0x07,'8':0x7f,'9':0x6f,
-                    'A':0x77,'b':0x7c,'C':0x39,'d':0x5e,'E':0x79,'F':0x71,'P':0x73,'n':0x54,'o':0x5c,'r':0x50,'t':0x78,' ':0x00,'-':0x40}
-        self._write_command(0x40)
-        GPIO.output(self.stb, GPIO.LOW)
-        self._write_byte(0xC0)
-        text = text[:8].ljust(8)
-        for char in text:
-            self._write_byte(segments.get(char, 0x00))
-            self._write_byte(0x00) # ข้าม byte LED
-        GPIO.output(self.stb, GPIO.HIGH)
-
-    def set_led(self, pos, state):
-        self._write_command(0x44)
-        GPIO.output(self.stb, GPIO.LOW)
-        self._write_byte(0xC1 + (pos * 2))
-        self._write_byte(1 if state else 0)
-        GPIO.output(self.stb, GPIO.HIGH)
+        for n, char in enumerate(text[:DIGITS].ljust(DIGITS)): self._want[2 * n] = SEGMENTS.get(char, SEGMENTS.get(char.swapcase(), 0x00))
+        if flush: self.flush()
 
-    def get_keys(self):
+    def set_led(self, pos, state, flush=True):
+        self._want[2 * pos + 1] = 1 if state else 0
+        if flush: self.flush()
+
+    def set_leds(self, states, flush=True):
+        for pos, state in enumerate(states[:DIGITS]): self._want[2 * pos + 1] = 1 if state else 0
+        if flush: self.flush()
+
+    def set_brightness(self, level, on=True):
+        self._write_command((0x88 if on else 0x80) | max(0, min(7, level)))
+
+    # --- Keys ---
+    def read_keys(self):
+        # one scan: the 32-bit key word
         keys = 0
-        GPIO.output(self.stb, GPIO.LOW)
-        self._write_byte(0x42)
-        GPIO.setup(self.dio, GPIO.IN, pull_up_down=GPIO.PUD_UP)
-        for i in range(32):
-            GPIO.output(self.clk, GPIO.LOW)
-            if GPIO.input(self.dio):
-                keys |= (1 << i)
-            GPIO.output(self.clk, GPIO.HIGH)
-        GPIO.setup(self.dio, GPIO.OUT)
-        GPIO.output(self.stb, GPIO.HIGH)
-        return [(keys >> i) & 1 for i in [0, 8, 16, 24, 1, 9, 17, 25]]
+        g, clk, dio = self.gpio, self.clk, self.dio
+        out, inp = g.output, g.input
+        with self._bus:
+            out(self.stb, 0)
+            self._write_byte(READ)
+            g.setup(dio, g.IN, pull_up_down=g.PUD_UP)
+            for i in range(32):
+                out(clk, 0)
+                if inp(dio): keys |= (1 << i)
+                out(clk, 1)
+            g.setup(dio, g.OUT); self._dio_level = None
+            out(self.stb, 1)
+        return keys
+
+    def get_keys(self):
+        keys = self.read_keys()
+        return [(keys >> i) & 1 for i in KEY_BITS]
+
+    def start_scan(self, rate=200.0, debounce=2, nice=10):
+        # a key counts as pressed / released after `debounce` scans in a row agree; worst-case
+        # latency from the switch settling to the event is debounce / rate seconds
+        if self._scan is not None: return
+        self._stop.clear()
+        self._scan = threading.Thread(target=self._scan_loop, args=(1.0 / rate, debounce, nice), name="tm1638-keys", daemon=True)
+        self._scan.start()
+
+    def stop_scan(self):
+        if self._scan is None: return
+        self._stop.set(); self._scan.join(1.0); self._scan = None
+
+    def _scan_loop(self, period, debounce, nice):
+        try: os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice) # this thread only, on Linux
+        except (AttributeError, OSError): pass
+        stable = 0 # debounced key word
+        last = count = 0
+        due = time.perf_counter()
+        while not self._stop.is_set():
+            raw = self.read_keys()
+            count = count + 1 if raw == last else 1; last = raw
+            if count == debounce and raw != stable:
+                t = time.perf_counter_ns()
+                for key, bit in enumerate(KEY_BITS):
+                    if (raw ^ stable) >> bit & 1: self.events.put((key, bool(raw >> bit & 1), t))
+                stable = raw
+            due += period
+            wait = due - time.perf_counter()
+            if wait < 0: due = time.perf_counter() # fell behind (scheduler, GC): don't try to catch up
+            else: self._stop.wait(wait)
+
+    def close(self):
+        self.stop_scan()
+
+
+class SimGPIO:
+    """Stand-in for RPi.GPIO that decodes the TM1638 bus into a model of the chip.
+
+    ram holds what a real chip would display; press() / release() set keys for the next
+    scan; calls counts every GPIO call the driver makes.
+    """
+
+    OUT, IN, PUD_UP, BCM, LOW, HIGH = 0, 1, 21, 11, 0, 1
+
+    def __init__(self, dio, clk, stb):
+        self.dio, self.clk, self.stb = dio, clk, stb
+        self.ram = bytearray(2 * DIGITS)
+        self.control = 0
+        self.keys = 0
+        self.calls = 0
+        self._level = {dio: 1, clk: 1, stb: 1}
+        self._frame = []
+        self._byte = self._nbits = 0
+        self._mode = AUTO
+        self._addr = None
+        self._rbit = 0
+        self._lock = threading.Lock() # press() comes from the test thread, scans from the driver's
+
+    def setwarnings(self, flag): pass
+    def setmode(self, mode): pass
+    def setup(self, pin, mode, pull_up_down=None): self.calls += 1
+
+    def press(self, key, down=True):
+        with self._lock:
+            if down: self.keys |= 1 << KEY_BITS[key]
+            else: self.keys &= ~(1 << KEY_BITS[key])
+
+    def release(self, key): self.press(key, False)
+
+    def output(self, pin, v):
+        self.calls += 1
+        rising = pin == self.clk and v and not self._level[pin]
+        self._level[pin] = v
+        if pin == self.stb:
+            if not v: self._frame = []; self._byte = self._nbits = 0; self._addr = None; self._rbit = 0
+        elif rising and not self._level[self.stb]:
+            if self._frame and self._frame[0] == READ: self._rbit += 1; return
+            self._byte |= (self._level[self.dio] & 1) << self._nbits; self._nbits += 1
+            if self._nbits == 8: self._on_byte(self._byte); self._byte = self._nbits = 0
+
+    def input(self, pin):
+        self.calls += 1
+        with self._lock: return (self.keys >> self._rbit) & 1
+
+    def _on_byte(self, b):
+        self._frame.append(b)
+        if len(self._frame) == 1:
+            if b in (AUTO, FIXED): self._mode = b
+            elif b & 0xF0 == ADDRESS: self._addr = b & 0x0F
+            elif b & 0xF0 == 0x80: self.control = b
+        elif self._addr is not None:
+            self.ram[self._addr] = b
+            if self._mode == AUTO: self._addr = (self._addr + 1) % len(self.ram)
@@ -0,0 +1,103 @@
+import threading
+import numpy as np
+from scipy.signal import decimate
+from ringbuffer import SampleRing
+
+# --- Chromatic tuner ---
+#
+# The audio callback only copies raw input into a SampleRing (tap). A worker thread takes
+# the newest window, decimates it, runs FFT-based YIN with parabolic interpolation and maps
+# the result straight to one of the 12 notes plus a cents offset.
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+
+def freq_to_note(freq, a4=440.0):
+    midi = 69 + 12 * np.log2(freq / a4)
+    n = int(round(midi))
+    return f"{NOTE_NAMES[n % 12]}{n // 12 - 1}", float((midi - n) * 100)
+
+def yin(x, fs, fmin=60.0, fmax=1400.0, threshold=0.12):
+    # returns (frequency in Hz, aperiodicity) or (0.0, 1.0) if no pitch was found
+    tau_max = min(int(fs / fmin) + 2, len(x) // 2)
+    tau_min = max(int(fs / fmax), 2)
+    w = len(x) - tau_max # integration window
+    nfft = 1 << int(np.ceil(np.log2(len(x) + w)))
+    # r(tau) = sum_j x[j] x[j + tau] over the window, for every tau at once
+    r = np.fft.irfft(np.fft.rfft(x, nfft) * np.conj(np.fft.rfft(x[:w], nfft)), nfft)[:tau_max]
+    e = np.concatenate(([0.0], np.cumsum(x * x)))
+    energy = e[w:w + tau_max] - e[:tau_max] # sum of x^2 over [tau, tau + w)
+    d = energy[0] + energy - 2 * r
+    d[0] = 0
+    # cumulative mean normalised difference
+    cmnd = np.ones(tau_max)
+    cs = np.cumsum(d[1:])
+    cmnd[1:] = d[1:] * np.arange(1, tau_max) / np.maximum(cs, 1e-12)
+
+    below = np.nonzero(cmnd[tau_min:] < threshold)[0]
+    if len(below):
+        tau = tau_min + below[0]
+        while tau + 1 < tau_max and cmnd[tau + 1] < cmnd[tau]: tau += 1
+    else:
+        tau = tau_min + int(np.argmin(cmnd[tau_min:]))
+        if cmnd[tau] > 0.35: return 0.0, 1.0
+    if 0 < tau < tau_max - 1:
+        a, b, c = cmnd[tau - 1], cmnd[tau], cmnd[tau + 1]
+        den = a - 2 * b + c
+        shift = 0.5 * (a - c) / den if den != 0 else 0.0
+    else:
+        shift = 0.0
+    return fs / (tau + shift), float(cmnd[tau])
+
+
+class Tuner:
+    def __init__(self, fs, window=None, decim=None, rate=20, min_rms=0.005, ring=None):
+        # ring: read input from an existing SampleRing (e.g. one the DSP process writes) instead of tap().
+        # By default YIN runs at ~22-24 kHz on 8192 / 2 samples whatever fs is: decim 2 at 44.1 / 48k, 4 at 96k
+        decim = decim or max(1, fs // 22050)
+        window = window or 4096 * decim
+        self.fs = fs
+        self.decim = decim
+        self.period = 1.0 / rate
+        self.min_rms = min_rms
+        self.ring = ring if ring is not None else SampleRing(1 << int(np.ceil(np.log2(window * 2))))
+        self._window = np.zeros(window, dtype=np.float32)
+        self.note = "-" # e.g. "A2"
+        self.cents = 0.0
+        self.freq = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def tap(self, sig):
+        # audio thread: nothing but a copy into the ring
+        self.ring.write(sig)
+
+    def start(self):
+        if self._thread is not None: return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tuner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None: return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.note, self.cents, self.freq = "-", 0.0, 0.0
+
+    def analyse(self, x):
+        x = x.astype(np.float64)
+        x -= x.mean()
+        if np.sqrt(np.mean(x * x)) < self.min_rms: return 0.0
+        if self.decim > 1: x = decimate(x, self.decim, ftype="fir", zero_phase=True)
+        freq, _ = yin(x, self.fs / self.decim)
+        return freq
+
+    def _run(self):
+        while not self._stop.wait(self.period):
+            if not self.ring.latest(self._window): continue
+            freq = self.analyse(self._window)
+            if freq > 0:
+                self.freq = freq
+                self.note, self.cents = freq_to_note(freq)
+            else:
+                self.note, self.cents, self.freq = "-", 0.0, 0.0